@@ -33,14 +33,50 @@ compose.default_container_prefix
     By default, prefix service units for containers with this
     string. Defaults to empty.
 
+compose.parallel
+    Maximum number of concurrent ``podman generate systemd`` and
+    ``systemctl start/stop/restart`` calls per composition. Defaults to 10.
+    Set it to 1 to act on units one after the other.
+
+compose.podman_api
+    Query containers and pods via the podman API socket
+    (``podman.socket``) when it is available instead of running
+    ``podman ps``/``podman inspect``. The connection is reused
+    for the duration of a Salt run. Defaults to True.
+
+compose.trust_state_sentinel
+    Record whether a composition was last started or stopped by this module
+    in a file below ``/run`` and let ``compose.is_running``/``compose.is_dead``
+    answer from it, as long as it is newer than the compose file.
+    Units that crashed or were stopped outside of Salt are not noticed
+    while the record exists. Defaults to False.
+
+Optional dependencies:
+
+dbus-fast
+    If installed, waiting for rootful units to start or stop listens for
+    systemd state changes on the system bus instead of polling ``systemctl``.
+    The session bus of other users refuses connections from root,
+    so rootless units are always polled.
+
 Todo:
     * import/export Kubernetes YAML files
 """
 
+import asyncio
+import contextvars
+import dataclasses
+import http.client
 import logging
+import os
 import re
 import shlex
-from functools import wraps
+import socket
+import threading
+import time
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from functools import wraps as _wraps
 from pathlib import Path
 
 import salt.utils.hashutils
@@ -49,6 +85,15 @@ import salt.utils.path
 import salt.utils.yaml
 from salt.exceptions import CommandExecutionError, SaltInvocationError
 
+try:
+    from dbus_fast import BusType, Message, MessageType
+    from dbus_fast.aio import MessageBus
+    from dbus_fast.errors import AuthError, InvalidAddressError
+
+    HAS_DBUS_FAST = True
+except ImportError:
+    HAS_DBUS_FAST = False
+
 # try:
 #     import podman_compose
 #     HAS_COMPOSE = True
@@ -57,6 +102,8 @@ from salt.exceptions import CommandExecutionError, SaltInvocationError
 
 log = logging.getLogger(__name__)
 
+__func_alias__ = {"open_": "open"}
+
 VALID_UNIT_TYPES = (
     "service",
     "socket",
@@ -91,10 +138,23 @@ PODMAN_RUN_NO_VALUE_PARAMS = (
     "unsetenv-all",
 )
 
+# ActiveState values systemctl_wait considers running/dead
+ACTIVE_STATES = ("active", "reloading")
+INACTIVE_STATES = ("inactive", "failed")
+
+# raised by install_units when there is nothing to generate units from
+_ERR_NO_POD = "Could not find existing pod or containers"
+
 containers_base = "/opt/containers"
 default_to_dirowner = True
 default_pod_prefix = ""
 default_container_prefix = ""
+default_parallel = 10
+podman_api = True
+trust_state_sentinel = False
+
+# the libpod API accepts any version it is compatible with
+PODMAN_API_VERSION = "v3.0.0"
 
 
 def __init__(opts):
@@ -102,12 +162,20 @@ def __init__(opts):
     global default_to_dirowner
     global default_pod_prefix
     global default_container_prefix
+    global default_parallel
+    global podman_api
+    global trust_state_sentinel
     containers_base = opts.get("compose.containers_base", containers_base)
     default_to_dirowner = opts.get("compose.default_to_dirowner", default_to_dirowner)
     default_pod_prefix = opts.get("compose.default_pod_prefix", default_pod_prefix)
     default_container_prefix = opts.get(
         "compose.default_container_prefix", default_container_prefix
     )
+    default_parallel = opts.get("compose.parallel", default_parallel)
+    podman_api = opts.get("compose.podman_api", podman_api)
+    trust_state_sentinel = opts.get(
+        "compose.trust_state_sentinel", trust_state_sentinel
+    )
 
 
 def _which_podman():
@@ -120,7 +188,7 @@ def _which_podman_compose():
 
 
 def _needs_compose(func):
-    @wraps(func)
+    @_wraps(func)
     def needs_compose(*args, **kwargs):
         if not _which_podman_compose():
             raise SaltInvocationError(
@@ -157,6 +225,7 @@ def _run(
     raise_error=True,
     expect_error=False,
     env=None,
+    timeout=None,
 ):
     """
     Generic helper for running some console commands.
@@ -189,6 +258,7 @@ def _run(
         env=env,
         runas=runas,
         ignore_retcode=expect_error,
+        timeout=timeout,
     )
 
     if not expect_error and raise_error and out["retcode"]:
@@ -227,6 +297,51 @@ def _convert_args(args):
     return converted
 
 
+def _wait_until(predicate, timeout):
+    """
+    Helper for polling until predicate returns True, backing off
+    from 10 ms to 250 ms between checks. Returns False on timeout.
+    """
+
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+
+    while not predicate():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.25)
+    return True
+
+
+def _map_parallel(func, items, parallel=None):
+    """
+    Helper for calling func for each item with a pool of worker threads.
+    Results are returned in the order of items. If any call raises,
+    the exception of the first failing item is reraised after all
+    calls have finished.
+    """
+
+    items = list(items)
+    if parallel is None:
+        parallel = default_parallel
+    workers = min(int(parallel or 1), len(items))
+
+    if workers <= 1:
+        return [func(item) for item in items]
+
+    # Salt resolves the loader dunders (__salt__, __context__, ...) through
+    # a ContextVar, which new threads do not inherit, so run each call in
+    # a copy of the current context
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [
+            executor.submit(contextvars.copy_context().run, func, item)
+            for item in items
+        ]
+    return [future.result() for future in futures]
+
+
 def _podman(
     command,
     args=None,
@@ -299,6 +414,118 @@ def _podman_compose(
     )
 
 
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    """
+    HTTP connection over a unix socket, used for talking to the podman API.
+    """
+
+    def __init__(self, socket_path, timeout=30):
+        super().__init__("localhost", timeout=timeout)
+        self.socket_path = socket_path
+
+    def connect(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        self.sock = sock
+
+
+def _podman_socket(user=None):
+    """
+    Returns the path of the podman API socket for a user.
+    """
+
+    if user is None:
+        return "/run/podman/podman.sock"
+    return f"/run/user/{_user_info(user, 'uid')}/podman/podman.sock"
+
+
+def _podman_session(user=None):
+    """
+    Helper function which leverages __context__ to keep a single
+    connection to the podman API socket per user.
+    Returns None if the API is disabled or the socket does not exist.
+    """
+
+    if not podman_api:
+        return None
+
+    contextkey = f"compose._podman_session.{user}"
+
+    if contextkey not in __context__:
+        socket_path = _podman_socket(user)
+        if os.path.exists(socket_path):
+            __context__[contextkey] = (
+                _UnixHTTPConnection(socket_path),
+                threading.Lock(),
+            )
+        else:
+            __context__[contextkey] = None
+    return __context__[contextkey]
+
+
+def _podman_api(endpoint, params=None, user=None):
+    """
+    Helper for querying the podman (libpod) API. Returns the parsed
+    response or None if the API is unavailable, in which case
+    the caller should fall back to the podman CLI.
+    """
+
+    session = _podman_session(user)
+    if session is None:
+        return None
+    conn, lock = session
+
+    url = f"/{PODMAN_API_VERSION}/libpod/{endpoint}"
+    if params:
+        url += "?" + urllib.parse.urlencode(params)
+
+    log.info("Querying podman API%s: %s", f" as user {user}" if user else "", url)
+
+    with lock:
+        # the service might have closed the kept-alive connection
+        # in the meantime, in which case the second try reconnects
+        for attempt in range(2):
+            try:
+                conn.request("GET", url)
+                resp = conn.getresponse()
+                body = resp.read()
+                break
+            except (http.client.HTTPException, OSError) as err:
+                conn.close()
+                if attempt:
+                    log.warning(
+                        "Podman API at %s is unavailable, falling back to CLI: %s",
+                        conn.socket_path,
+                        err,
+                    )
+                    __context__[f"compose._podman_session.{user}"] = None
+                    return None
+
+    if resp.status != 200:
+        raise CommandExecutionError(
+            f"Failed querying podman API endpoint {endpoint}.\n"
+            f"status: {resp.status}\n"
+            f"response: {body.decode(errors='replace')}"
+        )
+    return salt.utils.json.loads(body)
+
+
+def _api_filters(cmd_args):
+    """
+    Helper for converting CLI filter arguments to API filter parameters.
+    """
+
+    filters = {}
+
+    for arg in cmd_args:
+        if isinstance(arg, tuple) and arg[0] == "filter":
+            key, val = arg[1].split("=", 1)
+            filters.setdefault(key, []).append(val)
+
+    return {"filters": salt.utils.json.dumps(filters)} if filters else {}
+
+
 def _systemctl(
     command,
     args=None,
@@ -309,6 +536,7 @@ def _systemctl(
     raise_error=True,
     expect_error=False,
     env=None,
+    timeout=None,
 ):
     """
     Helper for running arbitary ``systemctl`` commands related to podman services.
@@ -322,7 +550,7 @@ def _systemctl(
         xdg_runtime_dir = f"/run/user/{uid}"
         dbus_session_bus = f"{xdg_runtime_dir}/bus"
 
-        if not Path(dbus_session_bus).exists():
+        if not os.path.exists(dbus_session_bus):
             raise CommandExecutionError(
                 f"User {runas} does not have lingering enabled. This is required "
                 "to run systemctl as a user that does not have a login session."
@@ -344,6 +572,7 @@ def _systemctl(
         raise_error=raise_error,
         expect_error=expect_error,
         env=env,
+        timeout=timeout,
     )
 
 
@@ -377,7 +606,7 @@ def _journalctl(
         xdg_runtime_dir = f"/run/user/{uid}"
         dbus_session_bus = f"{xdg_runtime_dir}/bus"
 
-        if not Path(dbus_session_bus).exists():
+        if not os.path.exists(dbus_session_bus):
             raise CommandExecutionError(
                 f"User {runas} does not have lingering enabled. This is required "
                 "to run systemctl as a user that does not have a login session."
@@ -437,12 +666,16 @@ def service_dir(user=None):
         The user account to return the service directory for.
         If unset, defaults to root.
     """
-    if user is None:
-        # This module generally assumes Salt is running as root
-        return str(Path("/") / "etc" / "systemd" / "system")
+    contextkey = f"compose.service_dir.{user}"
 
-    home = _user_info(user, "home")
-    return str(Path(home) / ".config" / "systemd" / "user")
+    if contextkey not in __context__:
+        if user is None:
+            # This module generally assumes Salt is running as root
+            __context__[contextkey] = str(Path("/") / "etc" / "systemd" / "system")
+        else:
+            home = _user_info(user, "home")
+            __context__[contextkey] = str(Path(home) / ".config" / "systemd" / "user")
+    return __context__[contextkey]
 
 
 def _canonical_unit_name(name):
@@ -501,12 +734,24 @@ def _clear_context():
     # raise a RuntimeError.
     for key in list(__context__):
         try:
-            if key.startswith("compose._systemctl_status."):
+            if key.startswith(("compose._systemctl_status.", "compose._status_many.")):
                 __context__.pop(key)
         except AttributeError:
             continue
 
 
+def _clear_status_many(units, user=None):
+    """
+    Remove cached status_many results for units that were acted upon.
+    """
+
+    cache = __context__.get(f"compose._status_many.{user}")
+    if not cache:
+        return
+    for unit in units if isinstance(units, list) else [units]:
+        cache.pop(_canonical_unit_name(unit), None)
+
+
 def _systemctl_status(name, user=None):
     """
     Helper function which leverages __context__ to keep from running 'systemctl
@@ -528,6 +773,154 @@ def _systemctl_status(name, user=None):
     return __context__[contextkey]
 
 
+def _systemctl_query(command, units, user=None):
+    """
+    Helper for querying several units with a single ``systemctl is-active``
+    or ``systemctl is-enabled`` call. Returns a map of unit name to reported state.
+    """
+
+    units = list(units)
+    out = _systemctl(command, params=units, runas=user, expect_error=True)
+    states = out["stdout"].splitlines()
+
+    if len(states) != len(units):
+        # Some units could not be queried (e.g. is-enabled for missing units
+        # only reports on stderr), so the output cannot be mapped reliably
+        states = [
+            _systemctl(command, params=[unit], runas=user, expect_error=True)["stdout"]
+            for unit in units
+        ]
+
+    return dict(zip(units, states))
+
+
+async def _dbus_call(bus, path, interface, member, signature="", body=None, dest=None):
+    """
+    Helper for calling a method on the systemd (or bus) D-Bus API.
+    """
+
+    reply = await bus.call(
+        Message(
+            destination=dest or "org.freedesktop.systemd1",
+            path=path,
+            interface=interface,
+            member=member,
+            signature=signature,
+            body=body or [],
+        )
+    )
+    if reply.message_type == MessageType.ERROR:
+        raise CommandExecutionError(
+            f"D-Bus call {member} failed: {reply.error_name} {reply.body}"
+        )
+    return reply.body
+
+
+async def _dbus_wait_active_state(units, wanted, timeout):
+    """
+    Wait until all units have reached one of the wanted ActiveStates by
+    listening for PropertiesChanged signals. Raises asyncio.TimeoutError
+    if they do not in time.
+    """
+
+    bus = await MessageBus(bus_type=BusType.SYSTEM).connect()
+
+    try:
+        states = {}
+        paths = {}
+        done = asyncio.get_running_loop().create_future()
+
+        def check():
+            if not done.done() and all(states.get(unit) in wanted for unit in units):
+                done.set_result(True)
+
+        def handler(msg):
+            if (
+                msg.message_type != MessageType.SIGNAL
+                or msg.member != "PropertiesChanged"
+                or msg.path not in paths
+                or msg.body[0] != "org.freedesktop.systemd1.Unit"
+            ):
+                return
+            if "ActiveState" in msg.body[1]:
+                states[paths[msg.path]] = msg.body[1]["ActiveState"].value
+                check()
+
+        bus.add_message_handler(handler)
+        await _dbus_call(
+            bus,
+            "/org/freedesktop/DBus",
+            "org.freedesktop.DBus",
+            "AddMatch",
+            "s",
+            [
+                "type='signal',sender='org.freedesktop.systemd1',"
+                "interface='org.freedesktop.DBus.Properties',"
+                "member='PropertiesChanged'"
+            ],
+            dest="org.freedesktop.DBus",
+        )
+        # systemd only emits unit signals while there are subscribers
+        await _dbus_call(
+            bus, "/org/freedesktop/systemd1", "org.freedesktop.systemd1.Manager", "Subscribe"
+        )
+
+        for unit in units:
+            path = (
+                await _dbus_call(
+                    bus,
+                    "/org/freedesktop/systemd1",
+                    "org.freedesktop.systemd1.Manager",
+                    "LoadUnit",
+                    "s",
+                    [unit],
+                )
+            )[0]
+            paths[path] = unit
+            # the reply is newer than any signal received before
+            states[unit] = (
+                await _dbus_call(
+                    bus,
+                    path,
+                    "org.freedesktop.DBus.Properties",
+                    "Get",
+                    "ss",
+                    ["org.freedesktop.systemd1.Unit", "ActiveState"],
+                )
+            )[0].value
+
+        check()
+        return await asyncio.wait_for(done, timeout)
+    finally:
+        bus.disconnect()
+
+
+def _dbus_wait(units, wanted, timeout, user=None):
+    """
+    Helper for waiting for unit state changes via D-Bus signals.
+    Returns True if the units reached the wanted state, False on timeout
+    and None if the bus is unavailable.
+    """
+
+    # the session bus of a user refuses connections from root,
+    # so only rootful units can be watched
+    if not HAS_DBUS_FAST or user is not None:
+        return None
+
+    contextkey = "compose._dbus_unavailable"
+    if __context__.get(contextkey):
+        return None
+
+    try:
+        return asyncio.run(_dbus_wait_active_state(units, wanted, timeout))
+    except asyncio.TimeoutError:
+        return False
+    except (OSError, AuthError, InvalidAddressError) as err:
+        log.debug("Cannot wait for units via D-Bus, falling back to polling: %s", err)
+        __context__[contextkey] = True
+        return None
+
+
 def _untracked_custom_unit_found(name, user=None):
     """
     If the passed service name is not available, but a unit file exist in
@@ -650,10 +1043,133 @@ def systemctl_is_running(unit, user=None):
         Salt process user.
     """
 
-    out = _systemctl("is-active", params=[unit], runas=user, expect_error=True)
+    # the exit code is all that is needed, so do not print the state
+    out = _systemctl(
+        "is-active", cmd_args=["quiet"], params=[unit], runas=user, expect_error=True
+    )
     return 0 == out["retcode"]
 
 
+def systemctl_wait(unit, running=True, timeout=10, user=None):
+    """
+    Wait until a systemd unit is running or dead. Returns False if it
+    did not reach that state within the timeout. This is an extension to the
+    official module, which allows executing this for a specific user.
+
+    If the ``dbus-fast`` library is available, this listens for state
+    changes of rootful units on the system bus instead of polling
+    ``systemctl is-active``.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.systemctl_wait podman.sock drone
+
+    unit
+        Name of the systemd unit. Can be a list to wait for several
+        units at once.
+
+    running
+        Wait for the unit to be running. If False, wait for it to be
+        dead (inactive or failed). Defaults to True.
+
+    timeout
+        Maximum time to wait in seconds. Defaults to 10.
+
+    user
+        The user to run systemctl with. Defaults to
+        Salt process user.
+    """
+
+    units = [_canonical_unit_name(u) for u in (unit if isinstance(unit, list) else [unit])]
+    wanted = ACTIVE_STATES if running else INACTIVE_STATES
+
+    reached = _dbus_wait(units, wanted, timeout, user=user)
+    if reached is not None:
+        return reached
+
+    return _wait_until(
+        lambda: all(
+            state in wanted
+            for state in _systemctl_query("is-active", units, user).values()
+        ),
+        timeout,
+    )
+
+
+def status_many(names, user=None, refresh=False):
+    """
+    Get ``ActiveState`` and ``UnitFileState`` of several systemd units with
+    a single ``systemctl show`` call. Results are cached for the duration
+    of a Salt run and dropped when this module acts on a unit.
+    This is an extension to the official module, which allows executing
+    this for a specific user.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.status_many '[podman.socket, podman-auto-update.timer]' drone
+
+    names
+        List of systemd unit names.
+
+    user
+        The user to run systemctl with. Defaults to
+        Salt process user.
+
+    refresh
+        Query the units again instead of returning cached results.
+        Required when waiting for a unit to change its state.
+        Defaults to False.
+    """
+
+    units = [
+        _canonical_unit_name(name)
+        for name in (names if isinstance(names, list) else [names])
+    ]
+    cache = __context__.setdefault(f"compose._status_many.{user}", {})
+    if refresh:
+        for unit in units:
+            cache.pop(unit, None)
+    missing = [unit for unit in units if unit not in cache]
+
+    if missing:
+        out = _systemctl(
+            "show",
+            cmd_args=[("property", "ActiveState,UnitFileState")],
+            params=missing,
+            runas=user,
+            expect_error=True,
+        )
+        # systemctl separates the properties of each unit with an empty line
+        blocks = out["stdout"].split("\n\n")
+
+        if len(blocks) != len(missing):
+            blocks = [
+                _systemctl(
+                    "show",
+                    cmd_args=[("property", "ActiveState,UnitFileState")],
+                    params=[unit],
+                    runas=user,
+                    expect_error=True,
+                )["stdout"]
+                for unit in missing
+            ]
+
+        for unit, block in zip(missing, blocks):
+            props = dict(
+                line.split("=", 1) for line in block.splitlines() if "=" in line
+            )
+            cache[unit] = {
+                "ActiveState": props.get("ActiveState", ""),
+                "UnitFileState": props.get("UnitFileState", ""),
+            }
+
+    return {unit: cache[unit] for unit in units}
+
+
 def systemctl_start(unit, user=None):
     """
     Start a systemd unit. This is an extension to the
@@ -674,6 +1190,7 @@ def systemctl_start(unit, user=None):
     """
 
     _systemctl("start", params=[unit], runas=user)
+    _clear_status_many(unit, user)
     return True
 
 
@@ -697,6 +1214,7 @@ def systemctl_stop(unit, user=None):
     """
 
     _systemctl("stop", params=[unit], runas=user)
+    _clear_status_many(unit, user)
     return True
 
 
@@ -720,9 +1238,103 @@ def systemctl_restart(unit, user=None):
     """
 
     _systemctl("restart", params=[unit], runas=user)
+    _clear_status_many(unit, user)
     return True
 
 
+def systemctl_transition(unit, action, timeout=10, user=None):
+    """
+    Start, stop or restart a systemd unit and check whether it reached the
+    expected state afterwards. Returns False if the job failed, did not
+    finish within the timeout or the unit ended up in the wrong state.
+    This is an extension to the official module, which allows executing
+    this for a specific user.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.systemctl_transition podman.sock restart user=drone
+
+    unit
+        Name of the systemd unit.
+
+    action
+        One of ``start``, ``stop`` or ``restart``.
+
+    timeout
+        Maximum time to wait for the job to finish in seconds. Defaults to 10.
+
+    user
+        The user to run systemctl with. Defaults to
+        Salt process user.
+    """
+
+    if action not in ("start", "stop", "restart"):
+        raise SaltInvocationError(
+            f"Invalid action '{action}', must be one of start, stop, restart"
+        )
+
+    # systemctl blocks until the queued job has finished, so the
+    # unit state only needs to be checked once afterwards
+    out = _systemctl(
+        action,
+        cmd_args=[("job-mode", "replace")],
+        params=[unit],
+        runas=user,
+        expect_error=True,
+        timeout=timeout,
+    )
+    _clear_status_many(unit, user)
+
+    # a timed out command does not have a retcode
+    if 0 != out["retcode"]:
+        log.warning(
+            "Failed to %s %s: %s", action, unit, out["stderr"] or out["stdout"]
+        )
+        return False
+    return systemctl_is_running(unit, user) is ("stop" != action)
+
+
+def systemctl_transition_many(units, action, timeout=10, user=None, parallel=None):
+    """
+    Start, stop or restart several systemd units concurrently and check whether
+    each of them reached the expected state. Returns a dict mapping each unit
+    to the result of ``compose.systemctl_transition``.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.systemctl_transition_many '[podman.socket, podman-auto-update.timer]' start user=drone
+
+    units
+        List of systemd unit names.
+
+    action
+        One of ``start``, ``stop`` or ``restart``.
+
+    timeout
+        Maximum time to wait for each job to finish in seconds. Defaults to 10.
+
+    user
+        The user to run systemctl with. Defaults to
+        Salt process user.
+
+    parallel
+        Maximum number of units to act on concurrently.
+        Defaults to ``compose.parallel``.
+    """
+
+    units = list(units)
+    results = _map_parallel(
+        lambda unit: systemctl_transition(unit, action, timeout=timeout, user=user),
+        units,
+        parallel,
+    )
+    return dict(zip(units, results))
+
+
 def systemctl_enable(unit, user=None):
     """
     Enable a systemd unit. This is an extension to the
@@ -735,14 +1347,17 @@ def systemctl_enable(unit, user=None):
         salt '*' compose.systemctl_enable podman.sock drone
 
     unit
-        Name of the systemd unit.
+        Name of the systemd unit. Can be a list to enable several units
+        with a single call.
 
     user
         The user to run systemctl with. Defaults to
         Salt process user.
     """
 
-    _systemctl("enable", params=[unit], runas=user)
+    units = unit if isinstance(unit, list) else [unit]
+    _systemctl("enable", params=units, runas=user)
+    _clear_status_many(units, user)
     return True
 
 
@@ -758,14 +1373,17 @@ def systemctl_disable(unit, user=None):
         salt '*' compose.systemctl_disable podman.sock drone
 
     unit
-        Name of the systemd unit.
+        Name of the systemd unit. Can be a list to disable several units
+        with a single call.
 
     user
         The user to run systemctl with. Defaults to
         Salt process user.
     """
 
-    _systemctl("disable", params=[unit], runas=user)
+    units = unit if isinstance(unit, list) else [unit]
+    _systemctl("disable", params=units, runas=user)
+    _clear_status_many(units, user)
     return True
 
 
@@ -966,27 +1584,38 @@ def has_changes(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    missing = list_missing_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
+    missing = list_missing_units(handle)
+
     ret = {"changed": [], "missing": missing}
 
     if status_only and missing["pods"] or missing["containers"]:
         return True
 
-    containers = ps(project_name, user=user)
+    ret["changed"] = _changed_units(handle, skip_removed=skip_removed)
+
+    if status_only:
+        return bool(
+            ret["changed"] or ret["missing"]["pods"] or ret["missing"]["containers"]
+        )
+    return ret
+
+
+def _changed_units(handle, skip_removed=False, installed_units=None):
+    """
+    Helper that lists containers/units whose configuration hash does not
+    match the current definitions of a CompositionHandle.
+    """
+
+    containers = ps(handle.project, user=handle.user)
 
     # semantically different:
     #   running containers vs unit files
@@ -998,28 +1627,20 @@ def has_changes(
     # 2) check if all necessary unit files are installed
 
     if not containers:
-        installed_units = list_installed_units(
-            composition,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        )
+        if installed_units is None:
+            installed_units = list_installed_units(handle)
         for srv in installed_units["containers"]:
             # this checks the service files themselves for ephemeral services
-            containers.append(inspect_unit(srv, user=user, podman_ps_if_running=False))
+            containers.append(
+                inspect_unit(srv, user=handle.user, podman_ps_if_running=False)
+            )
 
-    if not containers:
-        if status_only:
-            # this should be False always since there is a check above
-            # it should also never hit because that would imply there
-            # are no services defined inside the file
-            return bool(missing["pods"] or missing["containers"])
+    changed = []
 
-        return ret
+    if not containers:
+        return changed
 
-    new_hash, definitions = _get_compose_hash(composition)
+    new_hash, definitions = _get_compose_hash(handle.compose_path)
 
     for cnt in containers:
         config_hash = cnt["Labels"].get("io.podman.compose.config-hash")
@@ -1036,17 +1657,11 @@ def has_changes(
                 or cnt["Labels"].get("com.docker.compose.service")
                 in definitions["services"]
             ):
-                ret["changed"].append(
-                    cnt["Labels"].get("PODMAN_SYSTEMD_UNIT", cnt["Id"])
-                )
+                changed.append(cnt["Labels"].get("PODMAN_SYSTEMD_UNIT", cnt["Id"]))
 
     # This currently does not check for changes in pod service files @TODO
 
-    if status_only:
-        return bool(
-            ret["changed"] or ret["missing"]["pods"] or ret["missing"]["containers"]
-        )
-    return ret
+    return changed
 
 
 def list_outdated_units(
@@ -1096,25 +1711,22 @@ def list_outdated_units(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    installed_units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
-    new_hash, definitions = _get_compose_hash(composition)
+    installed_units = list_installed_units(handle)
+
+    new_hash, definitions = _get_compose_hash(handle.compose_path)
     changed = []
 
     for srv in installed_units["containers"]:
-        cnt = inspect_unit(srv, user=user, podman_ps_if_running=False)
+        cnt = inspect_unit(srv, user=handle.user, podman_ps_if_running=False)
         config_hash = cnt["Labels"].get("io.podman.compose.config-hash")
 
         if not config_hash:
@@ -1149,18 +1761,21 @@ def _list_units(
     Helper that lists expected service units and their paths.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
+    handle = _resolve(
+        composition,
+        project_name=project_name,
+        pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
+        separator=separator,
+        user=user,
+    )
 
-    if (container_prefix or pod_prefix) and separator is None:
+    if (handle.container_prefix or handle.pod_prefix) and handle.separator is None:
         separator = "-"
     else:
         separator = ""
 
-    with open(composition, "r") as f:
+    with open(handle.compose_path, "r") as f:
         definitions = salt.utils.yaml.load(f)
 
     service_names = []
@@ -1168,18 +1783,18 @@ def _list_units(
     for srv, conf in definitions["services"].items():
         replicas = int(conf.get("deploy", {}).get("replicas", 1))
         for num in range(1, replicas + 1):
-            name_default = f"{project_name}_{srv}_{num}"
+            name_default = f"{handle.project}_{srv}_{num}"
 
             if 1 == num:
                 name = conf.get("container_name", name_default)
             else:
                 name = name_default
 
-            service_names.append(f"{container_prefix}{separator}{name}")
+            service_names.append(f"{handle.container_prefix}{separator}{name}")
 
     # podman-compose currently automatically prefixes pods with "pod_"
     # this was not the case in 0.* versions
-    pod = f"{pod_prefix}{separator}pod_{project_name}"
+    pod = f"{handle.pod_prefix}{separator}pod_{handle.project}"
 
     return pod, service_names
 
@@ -1189,12 +1804,125 @@ def _is_unit_installed(service, user):
     Helper for checking if a unit file exists.
     """
 
-    sdir = Path(service_dir(user))
-    if not sdir.exists():
+    sdir = service_dir(user)
+    if not os.path.isdir(sdir):
         return False, None
 
-    path = sdir / (_canonical_unit_name(service))
-    return path.exists(), str(path)
+    path = os.path.join(sdir, _canonical_unit_name(service))
+    return os.path.exists(path), path
+
+
+def _unit_file_status(pod_name, service_names, user):
+    """
+    Helper that sorts expected service units into installed and missing ones.
+    Returns a tuple of two maps ``{pods: {}, containers: {}}``.
+    """
+
+    installed = {"containers": {}, "pods": {}}
+    missing = {"containers": {}, "pods": {}}
+
+    for service in service_names:
+        is_installed, path = _is_unit_installed(service, user)
+        (installed if is_installed else missing)["containers"][service] = path
+
+    is_installed, path = _is_unit_installed(pod_name, user)
+    (installed if is_installed else missing)["pods"][pod_name] = path
+
+    return installed, missing
+
+
+def _units_digest(units):
+    """
+    Helper to get a hash over a map of unit names to unit definitions.
+    """
+    return salt.utils.hashutils.sha256_digest(
+        salt.utils.json.dumps(sorted(units.items()), separators=(",", ":"))
+    )
+
+
+def _units_digest_file(project, user=None):
+    """
+    Helper that returns the path of the file caching the hash over
+    the installed unit definitions of a project.
+    """
+    return Path(service_dir(user)) / f".compose-{project}.sha256"
+
+
+def _write_units_digest(project, digest, user=None):
+    """
+    Helper for (atomically) updating the cached hash over the installed
+    unit definitions of a project.
+    """
+    digest_file = _units_digest_file(project, user)
+    tmp_file = digest_file.with_name(digest_file.name + ".tmp")
+    tmp_file.write_text(digest)
+    if user is not None:
+        os.chown(tmp_file, _user_info(user, "uid"), _user_info(user, "gid"))
+    os.replace(tmp_file, digest_file)
+
+
+def diff_unit_files(units, project=None, user=None):
+    """
+    Compare wanted service unit definitions with the installed unit files.
+    Returns a list of unit names whose files are missing or differ.
+
+    This is intended to be called with the output of
+    ``compose.install_units generate_only=True``.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.diff_unit_files '{"gitea": "[Unit]..."}' project=gitea user=gitea
+
+    units
+        Mapping of unit name (without ``.service`` suffix) to
+        its wanted contents.
+
+    project
+        The name of the project the units belong to. If specified and the
+        hash over the definitions matches the one cached when
+        ``compose.install_units`` last wrote the units, only the existence
+        of the unit files is checked. This function never writes the cache.
+
+    user
+        The user account the units are installed for. Defaults to
+        Salt process user.
+    """
+
+    # unit file paths are only needed as strings
+    unit_files = {
+        unit_name: os.path.join(service_dir(user), unit_name + ".service")
+        for unit_name in units
+    }
+    changed = []
+
+    if project is not None and units:
+        try:
+            digest_matches = (
+                _units_digest_file(project, user).read_text() == _units_digest(units)
+            )
+        except FileNotFoundError:
+            digest_matches = False
+        if digest_matches:
+            return [
+                unit_name
+                for unit_name, unit_file in unit_files.items()
+                if not os.path.exists(unit_file)
+            ]
+
+    for unit_name, unit_definitions in units.items():
+        # compare raw bytes, a missing file is reported by the open call already
+        try:
+            with open(unit_files[unit_name], "rb") as f:
+                current = f.read()
+        except FileNotFoundError:
+            changed.append(unit_name)
+            continue
+        if current != unit_definitions.encode():
+            changed.append(unit_name)
+
+    return changed
 
 
 def list_missing_units(
@@ -1252,36 +1980,26 @@ def list_missing_units(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    pod_name, service_names = _list_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
-    containers = {}
-    pods = {}
+    pod_name, service_names = _list_units(handle)
 
-    for service in service_names:
-        is_installed, path = _is_unit_installed(service, user)
-        if not is_installed:
-            containers[service] = path
+    _, missing = _unit_file_status(pod_name, service_names, handle.user)
 
-    is_installed, path = _is_unit_installed(pod_name, user)
-    if not is_installed and should_have_pod:
-        pods[pod_name] = path
+    if not should_have_pod:
+        missing["pods"] = {}
 
     if status_only:
-        return bool(containers or pods)
+        return bool(missing["containers"] or missing["pods"])
 
-    return {"containers": containers, "pods": pods}
+    return missing
 
 
 def list_installed_units(
@@ -1335,36 +2053,379 @@ def list_installed_units(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    pod_name, service_names = _list_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
+        pod_prefix=pod_prefix,
         container_prefix=container_prefix,
+        separator=separator,
+        user=user,
+    )
+
+    pod_name, service_names = _list_units(handle)
+
+    installed, _ = _unit_file_status(pod_name, service_names, handle.user)
+
+    if status_only:
+        return bool(installed["containers"] or installed["pods"])
+
+    return installed
+
+
+def project_status(
+    composition,
+    check_changes=True,
+    check_state=True,
+    skip_removed=False,
+    unit_kwargs=None,
+    project_name=None,
+    container_prefix=None,
+    pod_prefix=None,
+    separator=None,
+    user=None,
+    raise_not_found_error=True,
+):
+    """
+    Gather the status of a composition in a single call. This resolves
+    the composition and its service units only once, which makes it
+    considerably cheaper than calling the separate functions.
+
+    Returns a map with the following keys:
+
+    installed
+        Whether any service units for this composition are installed.
+
+    missing
+        Whether any container service units are missing.
+
+    has_changes
+        Whether the composition has changed since the last application
+        (see ``compose.has_changes``). None if ``check_changes`` is False.
+
+    wanted_units
+        The service unit definitions that would be generated from the existing
+        pod/containers. Empty if there are none, None if ``check_changes``
+        is False or ``unit_kwargs`` is unset.
+
+    units_changed
+        List of wanted units whose installed files are missing or outdated.
+        None if ``wanted_units`` is None.
+
+    running
+        Whether all installed service units are running. None if
+        ``check_state`` is False.
+
+    enabled
+        Whether the installed service units are enabled. None if
+        ``check_state`` is False.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.project_status gitea
+
+    composition
+        Some reference about where to find the project definitions.
+        Can be an absolute path to the composition definitions (``docker-compose.yml``),
+        the name of a project with available containers or the name
+        of a directory in ``compose.containers_base``.
+
+    check_changes
+        Check for changes in the definitions and generate the wanted units.
+        Defaults to True.
+
+    check_state
+        Check whether the installed units are running/enabled. Defaults to True.
+
+    skip_removed
+        If a container has been removed from a composition, but is still running,
+        do not count that as changes. Defaults to False.
+
+    unit_kwargs
+        Dictionary of parameters to ``compose.install_units`` to generate
+        the wanted units with. If unset, they are not generated.
+
+    project_name
+        The name of the project. Defaults to the name of the parent directory
+        of the composition file.
+
+    container_prefix:
+        Unit name prefix for containers. Defaults to empty.
+        A different default can be set in ``compose.default_container_prefix``.
+
+    pod_prefix
+        Unit name prefix for pods. Defaults to empty
+        (podman-compose prefixes pod names with pod_ already).
+        A different default can be set in ``compose.default_pod_prefix``.
+
+    separator
+        Unit name separator between prefix and name/id.
+        Depending on the other prefixes, defaults to empty or dash.
+
+    user
+        The user account this composition has been applied to. Defaults to
+        the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
+        or Salt process user. By default, defaults to the parent dir owner.
+
+    raise_not_found_error
+        Raise an error if the composition file cannot be found. If False,
+        return None instead. Defaults to True.
+    """
+
+    handle = _resolve(
+        composition,
+        project_name=project_name,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
+        raise_not_found_error=raise_not_found_error,
     )
+    if handle is None:
+        return None
 
-    containers = {}
-    pods = {}
+    pod_name, service_names = _list_units(handle)
+    installed, missing = _unit_file_status(pod_name, service_names, handle.user)
+
+    ret = {
+        "installed": bool(installed["containers"] or installed["pods"]),
+        "missing": bool(missing["containers"]),
+        "has_changes": None,
+        "wanted_units": None,
+        "units_changed": None,
+        "running": None,
+        "enabled": None,
+    }
 
-    for service in service_names:
-        is_installed, path = _is_unit_installed(service, user)
-        if is_installed:
-            containers[service] = path
+    if check_changes:
+        # Missing pods are not considered as changes, see has_changes
+        ret["has_changes"] = ret["missing"] or bool(
+            _changed_units(
+                handle, skip_removed=skip_removed, installed_units=installed
+            )
+        )
 
-    is_installed, path = _is_unit_installed(pod_name, user)
-    if is_installed:
-        pods[pod_name] = path
+        if unit_kwargs is not None:
+            try:
+                ret["wanted_units"] = install_units(
+                    handle.project,
+                    pod_prefix=handle.pod_prefix,
+                    container_prefix=handle.container_prefix,
+                    separator=handle.separator,
+                    user=handle.user,
+                    generate_only=True,
+                    **unit_kwargs,
+                )
+            except SaltInvocationError as err:
+                if _ERR_NO_POD not in (err.args[0] if err.args else ""):
+                    raise
+                ret["wanted_units"] = {}
+            ret["units_changed"] = diff_unit_files(
+                ret["wanted_units"], project=handle.project, user=handle.user
+            )
 
-    if status_only:
-        return bool(containers or pods)
+    if check_state:
+        ret["running"] = ret["enabled"] = False
+        running_services = list(installed["pods"]) + list(installed["containers"])
+        if running_services:
+            active = _systemctl_query("is-active", running_services, handle.user)
+            ret["running"] = all(
+                state in ("active", "reloading") for state in active.values()
+            )
+            if installed["pods"]:
+                enabled_services = [pod_name]
+            else:
+                enabled_services = list(installed["containers"])
+            enabled = _systemctl_query("is-enabled", enabled_services, handle.user)
+            ret["enabled"] = all("enabled" == state for state in enabled.values())
+
+    return ret
+
+
+def _sync_marker_file(project):
+    """
+    Helper that returns the path of the file recording the last successful
+    application of a project.
+    """
+    return Path(__opts__["cachedir"]) / "compose" / f"{project}.json"
+
+
+def _clear_sync_marker(project):
+    """
+    Helper that invalidates the record of the last successful application of a project.
+    """
+    try:
+        _sync_marker_file(project).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _sync_marker(composition, params, user):
+    """
+    Helper that builds the record of a successful application of a composition.
+    The composition file is identified by its stat results since
+    reading (and normalizing) it is much more expensive.
+    """
+    stat = os.stat(composition)
+    return {
+        "composition": composition,
+        "mtime_ns": stat.st_mtime_ns,
+        "size": stat.st_size,
+        "inode": stat.st_ino,
+        "params": salt.utils.hashutils.sha256_digest(
+            salt.utils.json.dumps(params or {}, sort_keys=True)
+        )[:16],
+        "user": user,
+    }
+
+
+def is_synced(composition, params=None, project_name=None, user=None):
+    """
+    Check whether a composition has been applied successfully by ``compose.installed``
+    and its compose file has not changed since. This only looks at the
+    compose file metadata and does not query podman or systemd.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.is_synced gitea
+
+    composition
+        Some reference about where to find the project definitions.
+        Can be an absolute path to the composition definitions (``docker-compose.yml``),
+        the name of a project with available containers or the name
+        of a directory in ``compose.containers_base``.
+
+    params
+        Dictionary of parameters the composition was applied with.
+        A change in parameters invalidates the record.
 
-    return {"containers": containers, "pods": pods}
+    project_name
+        The name of the project. Defaults to the name of the parent directory
+        of the composition file.
+
+    user
+        The user account this composition has been applied to. Defaults to
+        the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
+        or Salt process user. By default, defaults to the parent dir owner.
+    """
+
+    handle = _resolve(
+        composition, project_name=project_name, user=user, raise_not_found_error=False
+    )
+    if handle is None:
+        return False
+
+    try:
+        with open(_sync_marker_file(handle.project), "r") as f:
+            marker = salt.utils.json.load(f)
+    except (OSError, ValueError):
+        return False
+
+    return marker == _sync_marker(handle.compose_path, params, handle.user)
+
+
+def mark_synced(composition, params=None, project_name=None, user=None):
+    """
+    Record that a composition has been applied successfully. This is used
+    by ``compose.installed`` to skip all checks on subsequent runs if
+    the compose file has not changed. The record is invalidated by
+    ``compose.install``, ``compose.install_units`` and ``compose.remove``.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.mark_synced gitea
+
+    composition
+        Some reference about where to find the project definitions.
+        Can be an absolute path to the composition definitions (``docker-compose.yml``),
+        the name of a project with available containers or the name
+        of a directory in ``compose.containers_base``.
+
+    params
+        Dictionary of parameters the composition was applied with.
+
+    project_name
+        The name of the project. Defaults to the name of the parent directory
+        of the composition file.
+
+    user
+        The user account this composition has been applied to. Defaults to
+        the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
+        or Salt process user. By default, defaults to the parent dir owner.
+    """
+
+    handle = _resolve(composition, project_name=project_name, user=user)
+
+    marker_file = _sync_marker_file(handle.project)
+    marker_file.parent.mkdir(parents=True, exist_ok=True)
+    tmp_file = marker_file.with_name(marker_file.name + ".tmp")
+    with open(tmp_file, "w") as f:
+        salt.utils.json.dump(_sync_marker(handle.compose_path, params, handle.user), f)
+    os.replace(tmp_file, marker_file)
+    return True
+
+
+def _state_sentinel_file(project, user=None):
+    """
+    Helper that returns the path of the file recording the last
+    state a project was brought into. It lives on a tmpfs,
+    so it does not survive reboots.
+    """
+    if user is None:
+        return Path("/run") / f"compose-{project}.state"
+    return Path(f"/run/user/{_user_info(user, 'uid')}") / f"compose-{project}.state"
+
+
+def _write_state_sentinel(project, state, user=None):
+    if not trust_state_sentinel:
+        return
+    sentinel = _state_sentinel_file(project, user)
+    try:
+        sentinel.write_text(state)
+        if user is not None:
+            os.chown(sentinel, _user_info(user, "uid"), _user_info(user, "gid"))
+    except OSError as err:
+        log.debug("Could not record state of project %s: %s", project, err)
+
+
+def _clear_state_sentinel(project, user=None):
+    if not trust_state_sentinel:
+        return
+    try:
+        _state_sentinel_file(project, user).unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _clear_owner_cache():
+    """
+    Helper that drops the ID mappings cached by the ``compose.file_*`` states
+    since they might have changed with the containers.
+    """
+    for key in list(__context__):
+        if isinstance(key, str) and key.startswith("compose._resolve_owner."):
+            __context__.pop(key)
+
+
+def _read_state_sentinel(project, composition, user=None):
+    """
+    Helper that returns the recorded state of a project or None
+    if it is unknown or older than the compose file.
+    """
+    if not trust_state_sentinel:
+        return None
+    sentinel = _state_sentinel_file(project, user)
+    try:
+        if sentinel.stat().st_mtime_ns < os.stat(composition).st_mtime_ns:
+            return None
+        return sentinel.read_text()
+    except OSError:
+        return None
 
 
 def inspect(
@@ -1421,6 +2482,11 @@ def inspect(
     if fmt:
         cmd_args.append(("format", fmt))
     for container in containers:
+        if json:
+            parsed = _podman_api(f"containers/{container['Id']}/json", user=user)
+            if parsed is not None:
+                ret.append(parsed)
+                continue
         ret.append(
             _podman(
                 "inspect",
@@ -1607,6 +2673,7 @@ def install(
     pod_prefix=None,
     container_prefix=None,
     separator=None,
+    parallel=None,
 ):
     """
     Install a container composition.
@@ -1714,13 +2781,22 @@ def install(
     separator
         Unit name separator between prefix and name/id.
         Depending on the other prefixes, defaults to empty or dash.
+
+    parallel
+        Maximum number of units to act on concurrently. Defaults to 10.
+        A different default can be set in ``compose.parallel``.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
+    handle = _resolve(
+        composition,
+        project_name=project_name,
+        pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
+        separator=separator,
+        user=user,
+    )
 
-    pc_pod_support = podman_compose_supports_pods(user)
+    pc_pod_support = podman_compose_supports_pods(handle.user)
     if (
         create_pod is not None
         and create_pod != pc_pod_support["supported"]
@@ -1746,7 +2822,7 @@ def install(
         pod_args = (pod_args or []) + ["infra", {"share": ""}]
     podman_create_args = podman_create_args or []
 
-    args = [("file", composition), ("project-name", project_name)]
+    args = [("file", handle.compose_path), ("project-name", handle.project)]
     cmd_args = ["no-start"]
 
     # pod settings are only available in versions >=1.0.6
@@ -1786,22 +2862,26 @@ def install(
     if pull:
         cmd_args.append("pull")
 
-    with open(composition, "r") as f:
+    with open(handle.compose_path, "r") as f:
         defs = salt.utils.yaml.load(f)
         if not isinstance(defs, dict):
             raise SaltInvocationError(
-                f"Compose file at {composition} is malformed, not a dict"
+                f"Compose file at {handle.compose_path} is malformed, not a dict"
             )
 
+    _clear_sync_marker(handle.project)
+    _clear_state_sentinel(handle.project, handle.user)
+    _clear_owner_cache()
+
     out = _podman_compose(
         "up",
         args=args,
         cmd_args=cmd_args,
-        runas=user,
-        cwd=str(Path(composition).parent),
+        runas=handle.user,
+        cwd=str(Path(handle.compose_path).parent),
     )
 
-    present_containers = ps(project_name, status=["created"])
+    present_containers = ps(handle.project, status=["created"])
     wanted_containers = defs.get("services", {})
 
     if len(present_containers) < len(wanted_containers):
@@ -1820,11 +2900,11 @@ def install(
         )
 
     return install_units(
-        project_name,
-        pod_prefix=pod_prefix,
-        container_prefix=container_prefix,
-        separator=separator,
-        user=user,
+        handle.project,
+        pod_prefix=handle.pod_prefix,
+        container_prefix=handle.container_prefix,
+        separator=handle.separator,
+        user=handle.user,
         ephemeral=ephemeral,
         restart_policy=restart_policy,
         restart_sec=restart_sec,
@@ -1834,6 +2914,7 @@ def install(
         enable_units=enable_units,
         now=now,
         remove_containers=ephemeral,
+        parallel=parallel,
     )
 
 
@@ -1853,6 +2934,7 @@ def install_units(
     enable_units=True,
     now=False,
     remove_containers=False,
+    parallel=None,
 ):
     """
     Install systemd units for a composition.
@@ -1921,12 +3003,165 @@ def install_units(
         Ensure the template containers are removed after generating
         the service definitions. This is used to workaround an issue
         regarding ephemeral containers with dependencies. Defaults to false.
+
+    parallel
+        Maximum number of units to act on concurrently. Defaults to 10.
+        A different default can be set in ``compose.parallel``.
     """
 
     user = user or _try_find_user(project)
     project = _project_to_project_name(project)
     container_prefix = container_prefix or default_container_prefix
     pod_prefix = pod_prefix or default_pod_prefix
+
+    definitions, pod, ids = _render_units(
+        project,
+        pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
+        separator=separator,
+        user=user,
+        ephemeral=ephemeral,
+        restart_policy=restart_policy,
+        restart_sec=restart_sec,
+        stop_timeout=stop_timeout,
+        service_overrides=service_overrides,
+        pod_wants=pod_wants,
+        parallel=parallel,
+    )
+
+    if generate_only:
+        return definitions
+
+    _write_units(project, definitions, user=user)
+
+    if remove_containers:
+        if pod:
+            ids = ps(project, user=user)
+        cwd = ids[0]["Labels"]["com.docker.compose.project.working_dir"]
+        _podman_compose(
+            "down",
+            runas=user,
+            cwd=cwd,
+        )
+    # This assumes the name can be autodiscovered @FIXME
+    _activate_units(
+        _resolve(
+            project,
+            project_name=project,
+            pod_prefix=pod_prefix,
+            container_prefix=container_prefix,
+            separator=separator,
+            user=user,
+        ),
+        enable_units=enable_units,
+        now=now,
+        parallel=parallel,
+    )
+    return True
+
+
+def write_units(
+    units,
+    composition,
+    project_name=None,
+    pod_prefix=None,
+    container_prefix=None,
+    separator=None,
+    user=None,
+    enable_units=True,
+    now=False,
+    parallel=None,
+):
+    """
+    Install previously generated systemd units for a composition.
+    This avoids rendering the definitions again when they are already
+    known, e.g. from ``compose.project_status``.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.write_units '{"gitea": "[Unit]..."}' gitea user=gitea
+
+    units
+        Mapping of unit names (without ``.service`` suffix) to their
+        definitions, as returned by ``compose.install_units`` with
+        ``generate_only=True``.
+
+    composition
+        Some reference about where to find the project definitions.
+        Can be an absolute path to the composition definitions (``docker-compose.yml``),
+        the name of a project with available containers or the name
+        of a directory in ``compose.containers_base``.
+
+    project_name
+        The name of the project. Defaults to the name of the parent directory
+        of the composition file.
+
+    pod_prefix
+        Unit name prefix for pods.
+        Defaults to empty (podman-compose prefixes pod names with pod_ already).
+        A different default can be set in ``compose.default_pod_prefix``.
+
+    container_prefix:
+        Unit name prefix for containers. Defaults to empty.
+        A different default can be set in ``compose.default_container_prefix``.
+
+    separator
+        Unit name separator between prefix and name/id.
+        Depending on the other prefixes, defaults to empty or dash.
+
+    user
+        The user account this composition has been applied to. Defaults to
+        the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
+        or Salt process user. By default, defaults to the parent dir owner.
+
+    enable_units
+        Enable the service units after installation. Defaults to True.
+
+    now
+        Start the services after installation. Defaults to False.
+
+    parallel
+        Maximum number of units to act on concurrently. Defaults to 10.
+        A different default can be set in ``compose.parallel``.
+    """
+    if not units:
+        raise SaltInvocationError("Need at least one unit definition to write.")
+
+    handle = _resolve(
+        composition,
+        project_name=project_name,
+        pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
+        separator=separator,
+        user=user,
+    )
+
+    _write_units(handle.project, units, user=handle.user)
+    _activate_units(handle, enable_units=enable_units, now=now, parallel=parallel)
+    return True
+
+
+def _render_units(
+    project,
+    pod_prefix,
+    container_prefix,
+    separator,
+    user,
+    ephemeral=True,
+    restart_policy=None,
+    restart_sec=None,
+    stop_timeout=None,
+    service_overrides=None,
+    pod_wants=True,
+    parallel=None,
+):
+    """
+    Generate the unit definitions for a project without touching the
+    filesystem. Returns a tuple of the definitions, the pod list and the
+    ids the definitions were generated for.
+    """
     service_overrides = service_overrides or {}
 
     pod = pps(project, user=user)
@@ -1974,9 +3209,7 @@ def install_units(
     if stop_timeout is not None:
         cmd_args.append(("time", stop_timeout))
 
-    # need the definitions for finding the unit names
-    definitions = {}
-    for i in ids:
+    def generate(i):
         extra_cmd_args = []
         if not isinstance(i, str):
             service_name = i["Labels"].get("com.docker.compose.service", "")
@@ -1984,7 +3217,7 @@ def install_units(
                 extra_cmd_args.extend(list(service_overrides[service_name].items()))
             i = i["Id"]
 
-        out = _podman(
+        return _podman(
             "generate systemd",
             cmd_args=cmd_args + extra_cmd_args,
             params=[i],
@@ -1992,6 +3225,9 @@ def install_units(
             json=True,
         )
 
+    # need the definitions for finding the unit names
+    definitions = {}
+    for out in _map_parallel(generate, ids, parallel):
         for name, unit in out["parsed"].items():
             if name in definitions:
                 raise CommandExecutionError(
@@ -2005,14 +3241,16 @@ def install_units(
             r"^Requires=", "Wants=", definitions[pod_name], flags=re.MULTILINE
         )
 
-    if generate_only:
-        return definitions
+    return definitions, pod, ids
+
 
-    cwd = Path(service_dir(user))
+def _write_units(project, definitions, user=None):
+    _clear_sync_marker(project)
+    sdir = service_dir(user)
 
     for service_name, service_definitions in definitions.items():
         ret = __salt__["file.manage_file"](
-            cwd / (service_name + ".service"),
+            os.path.join(sdir, service_name + ".service"),
             contents=service_definitions,
             makedirs=True,
             user=user,
@@ -2029,36 +3267,15 @@ def install_units(
         if not ret["result"]:
             raise CommandExecutionError(ret["comment"])
 
-    if remove_containers:
-        if pod:
-            ids = ps(project, user=user)
-        cwd = ids[0]["Labels"]["com.docker.compose.project.working_dir"]
-        _podman_compose(
-            "down",
-            runas=user,
-            cwd=cwd,
-        )
-    # This assumes the name can be autodiscovered @FIXME
+    _write_units_digest(project, _units_digest(definitions), user)
+
+
+def _activate_units(handle, enable_units=True, now=False, parallel=None):
     # Previously, this was done with calling systemctl directly
     if enable_units:
-        enable(
-            project,
-            project_name=project,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        )
+        enable(handle)
     if now:
-        start(
-            project,
-            project_name=project,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        )
-    return True
+        start(handle, parallel=parallel)
 
 
 @_needs_compose
@@ -2096,19 +3313,17 @@ def logs(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
+    handle = _resolve(composition, project_name=project_name, user=user)
 
-    args = [("file", composition), ("project-name", project_name)]
+    args = [("file", handle.compose_path), ("project-name", handle.project)]
     params = [container] if container else []
 
     return _podman_compose(
         "logs",
         args=args,
-        runas=user,
+        runas=handle.user,
         params=params,
-        cwd=str(Path(composition).parent),
+        cwd=str(Path(handle.compose_path).parent),
     )
 
 
@@ -2164,50 +3379,47 @@ def remove(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-
-    if is_running(
+    handle = _resolve(
         composition,
         project_name=project_name,
         pod_prefix=pod_prefix,
         container_prefix=container_prefix,
         separator=separator,
         user=user,
-    ):
+    )
+
+    if is_running(handle):
         raise CommandExecutionError(
-            f"Cannot remove composition {composition} because the service(s) are still running."
+            f"Cannot remove composition {handle.compose_path} "
+            "because the service(s) are still running."
         )
 
     # check if the unit files are ephemeral or not
     # a better check would be to run inspect_unit and look for AutoRemove @TODO
     containers = ps(
-        composition,
+        handle.compose_path,
         status=["created", "paused", "stopped", "exited", "unknown"],
-        user=user,
+        user=handle.user,
     )
 
-    containers += pps(composition, user=user)
+    containers += pps(handle.compose_path, user=handle.user)
+
+    _clear_sync_marker(handle.project)
+    _clear_state_sentinel(handle.project, handle.user)
+    _clear_owner_cache()
 
     if containers or volumes:
-        args = [("file", composition), ("project-name", project_name)]
+        args = [("file", handle.compose_path), ("project-name", handle.project)]
         cmd_args = []
         if volumes:
             cmd_args.append("volumes")
-        _podman_compose("down", args=args, cmd_args=cmd_args, runas=user)
+        _podman_compose("down", args=args, cmd_args=cmd_args, runas=handle.user)
 
-    units = list_installed_units(
-        composition,
-        project_name=project_name,
-        container_prefix=container_prefix,
-        pod_prefix=pod_prefix,
-        separator=separator,
-        user=user,
-    )
+    units = list_installed_units(handle)
 
     for unit in list(units["containers"].values()) + list(units["pods"].values()):
         __salt__["file.remove"](unit)
+    __salt__["file.remove"](str(_units_digest_file(handle.project, handle.user)))
 
     return True
 
@@ -2331,6 +3543,12 @@ def pps(
             for fltr in ensure_list(var):
                 cmd_args.append(("filter", f"{fltr_name}={fltr}"))
 
+    parsed = _podman_api("pods/json", params=_api_filters(cmd_args), user=user)
+    if parsed is not None:
+        if id_only:
+            return [pod["Id"][:12] for pod in parsed]
+        return parsed
+
     if id_only:
         cmd_args.append(("format", "'{{.ID}}'"))
 
@@ -2430,6 +3648,19 @@ def ps(
             for fltr in ensure_list(var):
                 cmd_args.append(("filter", f"{fltr_name}={fltr}"))
 
+    parsed = _podman_api(
+        "containers/json",
+        params={"all": "true", **_api_filters(cmd_args)},
+        user=user,
+    )
+    if parsed is not None:
+        if id_only:
+            return [cnt["Id"][:12] for cnt in parsed]
+        if pod_only:
+            # libpod omits the field for containers outside of a pod
+            return [cnt["Pod"][:12] for cnt in parsed if cnt.get("Pod", "")]
+        return parsed
+
     if id_only:
         cmd_args.append(("format", "'{{.ID}}'"))
     elif pod_only:
@@ -2439,7 +3670,7 @@ def ps(
 
     out = _podman("ps", cmd_args=cmd_args, json=json, runas=user)
     if id_only or pod_only:
-        return list(out["stdout"].splitlines())
+        return [line for line in out["stdout"].splitlines() if line]
     return out["parsed"]
 
 
@@ -2492,20 +3723,19 @@ def journal(
         the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
         or Salt process user. By default, defaults to the parent dir owner.
     """
-    composition = find_compose_file(composition)
-    user = user or _find_user(composition)
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
+    units = list_installed_units(handle)
     out = {}
 
     for unit in units["containers"]:
-        journal_lines = _journalctl(unit, runas=user)["stdout"].splitlines()
+        journal_lines = _journalctl(unit, runas=handle.user)["stdout"].splitlines()
         if len(journal_lines) > max_lines:
             journal_lines = journal_lines[:max_lines]
         out[unit] = "\n".join(journal_lines)
@@ -2559,20 +3789,19 @@ def status(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    user = user or _find_user(composition)
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
+    units = list_installed_units(handle)
     out = {}
 
     for unit in units["containers"]:
-        sctl_status = systemctl_status(unit, user)
+        sctl_status = systemctl_status(unit, handle.user)
         out[unit] = sctl_status
 
     return out
@@ -2622,21 +3851,17 @@ def disable(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
+    units = list_installed_units(handle)
+
     if units["pods"]:
         disable_services = [next(iter(units["pods"]))]
     else:
@@ -2644,12 +3869,13 @@ def disable(
 
     if not disable_services:
         raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
+            f"Could not find any units belonging to project {handle.project} "
+            f"for user {handle.user}."
         )
 
     for service in disable_services:
-        _check_for_unit_changes(service, user)
-        systemctl_disable(service, user)
+        _check_for_unit_changes(service, handle.user)
+    systemctl_disable(disable_services, handle.user)
 
     return True
 
@@ -2698,21 +3924,17 @@ def enable(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
+    units = list_installed_units(handle)
+
     if units["pods"]:
         enable_services = [next(iter(units["pods"]))]
     else:
@@ -2720,12 +3942,13 @@ def enable(
 
     if not enable_services:
         raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
+            f"Could not find any units belonging to project {handle.project} "
+            f"for user {handle.user}."
         )
 
     for service in enable_services:
-        _check_for_unit_changes(service, user)
-        systemctl_enable(service, user)
+        _check_for_unit_changes(service, handle.user)
+    systemctl_enable(enable_services, handle.user)
 
     return True
 
@@ -2737,6 +3960,7 @@ def restart(
     container_prefix=None,
     separator=None,
     user=None,
+    parallel=None,
 ):
     """
     Restart the installed units for a composition.
@@ -2772,27 +3996,27 @@ def restart(
         The user account this composition has been applied to. Defaults to
         the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
         or Salt process user. By default, defaults to the parent dir owner.
-    """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
+    parallel
+        Maximum number of units to act on concurrently. Defaults to 10.
+        A different default can be set in ``compose.parallel``.
+    """
 
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
+    units = list_installed_units(handle)
+
     if units["pods"]:
         restart_services = [next(iter(units["pods"]))]
         # systemctl restart seems to fail for pods
-        systemctl_stop(restart_services[0], user)
+        systemctl_stop(restart_services[0], handle.user)
         func = systemctl_start
     else:
         restart_services = list(units["containers"])
@@ -2800,12 +4024,15 @@ def restart(
 
     if not restart_services:
         raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
+            f"Could not find any units belonging to project {handle.project} "
+            f"for user {handle.user}."
         )
 
+    # reload once before acting on the units concurrently
     for service in restart_services:
-        _check_for_unit_changes(service, user)
-        func(service, user)
+        _check_for_unit_changes(service, handle.user)
+    _map_parallel(lambda service: func(service, handle.user), restart_services, parallel)
+    _write_state_sentinel(handle.project, "running", handle.user)
 
     return True
 
@@ -2817,6 +4044,7 @@ def start(
     container_prefix=None,
     separator=None,
     user=None,
+    parallel=None,
 ):
     """
     Run the installed units for a composition.
@@ -2852,23 +4080,23 @@ def start(
         The user account this composition has been applied to. Defaults to
         the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
         or Salt process user. By default, defaults to the parent dir owner.
-    """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
+    parallel
+        Maximum number of units to act on concurrently. Defaults to 10.
+        A different default can be set in ``compose.parallel``.
+    """
 
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
+    units = list_installed_units(handle)
+
     if units["pods"]:
         start_services = [next(iter(units["pods"]))]
     else:
@@ -2877,12 +4105,17 @@ def start(
 
     if not start_services:
         raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
+            f"Could not find any units belonging to project {handle.project} "
+            f"for user {handle.user}."
         )
 
+    # reload once before acting on the units concurrently
     for service in start_services:
-        _check_for_unit_changes(service, user)
-        systemctl_start(service, user)
+        _check_for_unit_changes(service, handle.user)
+    _map_parallel(
+        lambda service: systemctl_start(service, handle.user), start_services, parallel
+    )
+    _write_state_sentinel(handle.project, "running", handle.user)
 
     return True
 
@@ -2894,6 +4127,7 @@ def stop(
     container_prefix=None,
     separator=None,
     user=None,
+    parallel=None,
 ):
     """
     Stop the installed units for a composition.
@@ -2929,23 +4163,23 @@ def stop(
         The user account this composition has been applied to. Defaults to
         the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
         or Salt process user. By default, defaults to the parent dir owner.
-    """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
+    parallel
+        Maximum number of units to act on concurrently. Defaults to 10.
+        A different default can be set in ``compose.parallel``.
+    """
 
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
+    units = list_installed_units(handle)
+
     if units["pods"]:
         stop_services = [next(iter(units["pods"]))]
     else:
@@ -2954,12 +4188,17 @@ def stop(
 
     if not stop_services:
         raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
+            f"Could not find any units belonging to project {handle.project} "
+            f"for user {handle.user}."
         )
 
+    # reload once before acting on the units concurrently
     for service in stop_services:
-        _check_for_unit_changes(service, user)
-        systemctl_stop(service, user)
+        _check_for_unit_changes(service, handle.user)
+    _map_parallel(
+        lambda service: systemctl_stop(service, handle.user), stop_services, parallel
+    )
+    _write_state_sentinel(handle.project, "dead", handle.user)
 
     return True
 
@@ -3017,21 +4256,17 @@ def is_disabled(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
+    units = list_installed_units(handle)
+
     if units["pods"]:
         disabled_services = [next(iter(units["pods"]))]
     else:
@@ -3039,14 +4274,12 @@ def is_disabled(
 
     if not disabled_services:
         raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
+            f"Could not find any units belonging to project {handle.project} "
+            f"for user {handle.user}."
         )
 
-    enabled = []
-
-    for service in disabled_services:
-        if systemctl_is_enabled(service, user):
-            enabled.append(service)
+    states = _systemctl_query("is-enabled", disabled_services, handle.user)
+    enabled = [service for service, state in states.items() if "enabled" == state]
 
     if show_missing:
         return enabled
@@ -3104,21 +4337,17 @@ def is_enabled(
         or Salt process user. By default, defaults to the parent dir owner.
     """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
-
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
+    units = list_installed_units(handle)
+
     if units["pods"]:
         enabled_services = [next(iter(units["pods"]))]
     else:
@@ -3126,14 +4355,12 @@ def is_enabled(
 
     if not enabled_services:
         raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
+            f"Could not find any units belonging to project {handle.project} "
+            f"for user {handle.user}."
         )
 
-    disabled = []
-
-    for service in enabled_services:
-        if not systemctl_is_enabled(service, user):
-            disabled.append(service)
+    states = _systemctl_query("is-enabled", enabled_services, handle.user)
+    disabled = [service for service, state in states.items() if "enabled" != state]
 
     if show_missing:
         return disabled
@@ -3148,6 +4375,7 @@ def is_running(
     separator=None,
     show_missing=False,
     user=None,
+    refresh=False,
 ):
     """
     Check if the installed units for a composition are running.
@@ -3189,37 +4417,45 @@ def is_running(
         The user account this composition has been applied to. Defaults to
         the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
         or Salt process user. By default, defaults to the parent dir owner.
-    """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
+    refresh
+        Query the unit states again instead of using results cached
+        during this Salt run or the state record of
+        ``compose.trust_state_sentinel``. Defaults to False.
+    """
 
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
+    if not show_missing and not refresh:
+        recorded = _read_state_sentinel(handle.project, handle.compose_path, handle.user)
+        if recorded is not None:
+            return "running" == recorded
+
+    units = list_installed_units(handle)
+
     # need to check all the services, even with pods,
     # since their status does not rely on their containers (?)
     running_services = list(units["pods"]) + list(units["containers"])
 
     if not running_services:
         raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
+            f"Could not find any units belonging to project {handle.project} "
+            f"for user {handle.user}."
         )
 
-    inactive = []
-
-    for service in running_services:
-        if not systemctl_is_running(service, user):
-            inactive.append(service)
+    states = status_many(running_services, handle.user, refresh=refresh)
+    inactive = [
+        service
+        for service in running_services
+        if states[_canonical_unit_name(service)]["ActiveState"] not in ACTIVE_STATES
+    ]
 
     if show_missing:
         return inactive
@@ -3234,6 +4470,7 @@ def is_dead(
     separator=None,
     show_missing=False,
     user=None,
+    refresh=False,
 ):
     """
     Check if the installed units for a composition are dead.
@@ -3277,43 +4514,130 @@ def is_dead(
         The user account this composition has been applied to. Defaults to
         the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
         or Salt process user. By default, defaults to the parent dir owner.
-    """
 
-    composition = find_compose_file(composition)
-    project_name = project_name or _project_to_project_name(composition)
-    user = user or _find_user(composition)
-    container_prefix = container_prefix or default_container_prefix
-    pod_prefix = pod_prefix or default_pod_prefix
+    refresh
+        Query the unit states again instead of using results cached
+        during this Salt run or the state record of
+        ``compose.trust_state_sentinel``. Defaults to False.
+    """
 
-    units = list_installed_units(
+    handle = _resolve(
         composition,
         project_name=project_name,
-        container_prefix=container_prefix,
         pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
         separator=separator,
         user=user,
     )
 
+    if not show_missing and not refresh:
+        recorded = _read_state_sentinel(handle.project, handle.compose_path, handle.user)
+        if recorded is not None:
+            return "dead" == recorded
+
+    units = list_installed_units(handle)
+
     # need to check all the services, even with pods,
     # since their status does not rely on their containers (?)
     dead_services = list(units["pods"]) + list(units["containers"])
 
     if not dead_services:
         raise CommandExecutionError(
-            f"Could not find any units belonging to project {project_name} for user {user}."
+            f"Could not find any units belonging to project {handle.project} "
+            f"for user {handle.user}."
         )
 
-    active = []
-
-    for service in dead_services:
-        if systemctl_is_running(service, user):
-            active.append(service)
+    states = status_many(dead_services, handle.user, refresh=refresh)
+    active = [
+        service
+        for service in dead_services
+        if states[_canonical_unit_name(service)]["ActiveState"] in ACTIVE_STATES
+    ]
 
     if show_missing:
         return active
     return not bool(active)
 
 
+def wait(
+    composition,
+    running=True,
+    timeout=10,
+    project_name=None,
+    pod_prefix=None,
+    container_prefix=None,
+    separator=None,
+    user=None,
+):
+    """
+    Wait until the installed units for a composition are running or dead.
+    Returns False if they did not reach that state within the timeout.
+
+    If the ``dbus-fast`` library is available, this listens for state
+    changes of rootful units on the system bus instead of polling
+    ``systemctl is-active``.
+
+    .. code-block:: bash
+
+        salt '*' compose.wait gitea
+
+    composition
+        Some reference about where to find the project definitions.
+        Can be an absolute path to the composition definitions (``docker-compose.yml``),
+        the name of a project with available containers or the name
+        of a directory in ``compose.containers_base``.
+
+    running
+        Wait for the units to be running. If False, wait for them to be
+        dead. Defaults to True.
+
+    timeout
+        Maximum time to wait in seconds. Defaults to 10.
+
+    project_name
+        The name of the project. Defaults to the name of the parent directory
+        of the composition file.
+
+    pod_prefix
+        Unit name prefix for pods.
+        Defaults to empty (podman-compose prefixes pod names with pod_ already).
+        A different default can be set in ``compose.default_pod_prefix``.
+
+    container_prefix:
+        Unit name prefix for containers. Defaults to empty.
+        A different default can be set in ``compose.default_container_prefix``.
+
+    separator
+        Unit name separator between prefix and name/id.
+        Depending on the other prefixes, defaults to empty or dash.
+
+    user
+        The user account this composition has been applied to. Defaults to
+        the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
+        or Salt process user. By default, defaults to the parent dir owner.
+    """
+
+    handle = _resolve(
+        composition,
+        project_name=project_name,
+        pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
+        separator=separator,
+        user=user,
+    )
+
+    units = list_installed_units(handle)
+    services = list(units["pods"]) + list(units["containers"])
+
+    if not services:
+        raise CommandExecutionError(
+            f"Could not find any units belonging to project {handle.project} "
+            f"for user {handle.user}."
+        )
+
+    return systemctl_wait(services, running=running, timeout=timeout, user=handle.user)
+
+
 def version(user=None):
     """
     Get podman-compose version. Returns False if not installed (in $PATH)
@@ -3329,11 +4653,14 @@ def version(user=None):
         Find podman-compose version for this user. Defaults to Salt process user.
     """
 
-    out = _podman_compose("version", cmd_args=["short"], runas=user, raise_error=False)
+    contextkey = f"compose.version.{user}"
 
-    if out["retcode"]:
-        return False
-    return out["stdout"]
+    if contextkey not in __context__:
+        out = _podman_compose(
+            "version", cmd_args=["short"], runas=user, raise_error=False
+        )
+        __context__[contextkey] = False if out["retcode"] else out["stdout"]
+    return __context__[contextkey]
 
 
 def podman_version(user=None):
@@ -3351,12 +4678,15 @@ def podman_version(user=None):
         Find podman version for this user. Defaults to Salt process user.
     """
 
-    out = _podman("--version", runas=user, raise_error=False)
-    if out["retcode"]:
-        return False
-    _version = re.findall(r"[0-9\.]+$", out["stdout"])[0]
+    contextkey = f"compose.podman_version.{user}"
 
-    return _version
+    if contextkey not in __context__:
+        out = _podman("--version", runas=user, raise_error=False)
+        if out["retcode"]:
+            __context__[contextkey] = False
+        else:
+            __context__[contextkey] = re.findall(r"[0-9\.]+$", out["stdout"])[0]
+    return __context__[contextkey]
 
 
 def autoupdate(
@@ -3390,8 +4720,7 @@ def autoupdate(
         the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
         or Salt process user. By default, defaults to the parent dir owner.
     """
-    composition = find_compose_file(composition)
-    user = user or _find_user(composition)
+    handle = _resolve(composition, user=user)
 
     cmd_args = []
 
@@ -3400,7 +4729,7 @@ def autoupdate(
     if dry_run:
         cmd_args.append("dry-run")
 
-    return _podman("auto-update", cmd_args=cmd_args, runas=user)
+    return _podman("auto-update", cmd_args=cmd_args, runas=handle.user)
 
 
 def unshare(project, cmd, full=False, user=None):
@@ -3437,6 +4766,46 @@ def unshare(project, cmd, full=False, user=None):
     return out["stdout"]
 
 
+def idmaps(project, user=None):
+    """
+    Return the UID and GID maps of the user namespace the ``podman`` process
+    of a project runs in as lists of ``[inside ID, outside ID, count]``.
+    Both maps are read with a single ``podman unshare`` call and cached
+    for the duration of a Salt run.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.idmaps gitea
+
+    project
+        Either the absolute path to a composition file or a project name.
+
+    user
+        The user account this composition has been applied to. Defaults to
+        the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
+        or Salt process user. By default, defaults to the parent dir owner.
+    """
+
+    contextkey = f"compose.idmaps.{project}.{user}"
+    if contextkey not in __context__:
+        out = unshare(
+            project,
+            "sh -c 'cat /proc/self/uid_map; echo ===; cat /proc/self/gid_map'",
+            user=user,
+        )
+        __context__[contextkey] = {
+            kind: [
+                list(map(int, line.split()))
+                for line in idmap.splitlines()
+                if line.strip()
+            ]
+            for kind, idmap in zip(("uid", "gid"), out.split("==="))
+        }
+    return __context__[contextkey]
+
+
 def _project_to_project_name(project):
     """
     Returns the parent directory name of an absolute path to a composition file
@@ -3476,6 +4845,131 @@ def project_info(project, user=None):
     }
 
 
+@dataclasses.dataclass(frozen=True)
+class CompositionHandle:
+    """
+    A composition reference that has been resolved already.
+    See ``compose.open``.
+    """
+
+    compose_path: str
+    project: str
+    user: str = None
+    service_dir: str = None
+    pod_prefix: str = ""
+    container_prefix: str = ""
+    separator: str = None
+
+
+def _resolve(
+    composition,
+    project_name=None,
+    pod_prefix=None,
+    container_prefix=None,
+    separator=None,
+    user=None,
+    raise_not_found_error=True,
+):
+    """
+    Helper that resolves a composition reference to a CompositionHandle.
+    Handles (and their dict representation) are returned as-is,
+    the other parameters are ignored in that case.
+    Returns None if the composition cannot be found and
+    raise_not_found_error is False.
+    """
+
+    if isinstance(composition, CompositionHandle):
+        return composition
+    if isinstance(composition, dict):
+        return CompositionHandle(**composition)
+
+    compose_path = find_compose_file(
+        composition, user=user, raise_not_found_error=raise_not_found_error
+    )
+    if not compose_path:
+        return None
+    user = user or _find_user(compose_path)
+
+    return CompositionHandle(
+        compose_path=compose_path,
+        project=project_name or _project_to_project_name(compose_path),
+        user=user,
+        service_dir=service_dir(user),
+        pod_prefix=pod_prefix or default_pod_prefix,
+        container_prefix=container_prefix or default_container_prefix,
+        separator=separator,
+    )
+
+
+def open_(
+    composition,
+    project_name=None,
+    pod_prefix=None,
+    container_prefix=None,
+    separator=None,
+    user=None,
+    raise_not_found_error=True,
+):
+    """
+    Resolve a composition reference once. The returned dictionary can be
+    passed as ``composition`` to the functions of this module that manage
+    a composition, which then skip looking up the compose file, project
+    name and user again. Other naming parameters are ignored in that case.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' compose.open gitea
+
+    composition
+        Some reference about where to find the project definitions.
+        Can be an absolute path to the composition definitions (``docker-compose.yml``),
+        the name of a project with available containers or the name
+        of a directory in ``compose.containers_base``.
+
+    project_name
+        The name of the project. Defaults to the name of the parent directory
+        of the composition file.
+
+    pod_prefix
+        Unit name prefix for pods.
+        Defaults to empty (podman-compose prefixes pod names with pod_ already).
+        A different default can be set in ``compose.default_pod_prefix``.
+
+    container_prefix:
+        Unit name prefix for containers. Defaults to empty.
+        A different default can be set in ``compose.default_container_prefix``.
+
+    separator
+        Unit name separator between prefix and name/id.
+        Depending on the other prefixes, defaults to empty or dash.
+
+    user
+        The user account this composition has been applied to. Defaults to
+        the composition file parent dir owner (depending on ``compose.default_to_dirowner``)
+        or Salt process user. By default, defaults to the parent dir owner.
+
+    raise_not_found_error
+        Raise an error if the composition file cannot be found. If False,
+        return None instead. Defaults to True.
+    """
+
+    handle = _resolve(
+        composition,
+        project_name=project_name,
+        pod_prefix=pod_prefix,
+        container_prefix=container_prefix,
+        separator=separator,
+        user=user,
+        raise_not_found_error=raise_not_found_error,
+    )
+    if handle is None:
+        return None
+    # a plain dict can be returned to the master
+    return dataclasses.asdict(handle)
+
+
 def find_compose_file(project, user=None, raise_not_found_error=True):
     """
     Internal helper to find the project's composition file.
@@ -13,7 +13,12 @@ I forgot which problems I had using this method though.
 https://github.com/saltstack/salt/issues/40887
 """
 
+import ctypes
+import ctypes.util
 import logging
+import os
+import select
+import time
 from pathlib import Path
 
 import salt.utils.systemd
@@ -152,10 +157,43 @@ def is_running(unit, user=None):
         Salt process user.
     """
 
-    out = _systemctl("is-active", params=[unit], runas=user, expect_error=True)
+    # the exit code is all that is needed, so do not print the state
+    out = _systemctl(
+        "is-active", cmd_args=["quiet"], params=[unit], runas=user, expect_error=True
+    )
     return 0 == out["retcode"]
 
 
+def wait(unit, running=True, timeout=10, user=None):
+    """
+    Wait until a systemd unit is running or dead. Returns False if it
+    did not reach that state within the timeout. This is an extension to the
+    official module, which allows executing this for a specific user.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' user_service.wait podman.sock drone
+
+    unit
+        Name of the systemd unit.
+
+    running
+        Wait for the unit to be running. If False, wait for it to be
+        stopped. Defaults to True.
+
+    timeout
+        Maximum time to wait in seconds. Defaults to 10.
+
+    user
+        The user to run systemctl with. Defaults to
+        Salt process user.
+    """
+
+    return _wait_until(lambda: is_running(unit, user=user) is running, timeout)
+
+
 def start(unit, user=None):
     """
     Start a systemd unit. This is an extension to the
@@ -316,6 +354,86 @@ def reload(user=None):
     return True
 
 
+# inotify(7) flags used for waiting on the session bus socket
+_IN_ATTRIB = 0x00000004
+_IN_MOVED_FROM = 0x00000040
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_DELETE = 0x00000200
+_IN_DELETE_SELF = 0x00000400
+_IN_NONBLOCK = os.O_NONBLOCK
+_IN_CLOEXEC = os.O_CLOEXEC
+_IN_WATCH_MASK = (
+    _IN_ATTRIB
+    | _IN_MOVED_FROM
+    | _IN_MOVED_TO
+    | _IN_CREATE
+    | _IN_DELETE
+    | _IN_DELETE_SELF
+)
+
+
+def _inotify_init():
+    """
+    Helper for creating a non-blocking inotify instance.
+    Returns a tuple of libc and the file descriptor or None if unavailable.
+    """
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        fd = libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+    except (AttributeError, OSError):
+        return None
+    if fd < 0:
+        return None
+    return libc, fd
+
+
+def _wait_for_path(path, exists=True, timeout=10):
+    """
+    Helper for waiting until a path exists (or does not exist anymore).
+    Watches the existing parent directories with inotify instead of polling.
+    """
+
+    deadline = time.monotonic() + timeout
+    parents = [
+        str(parent) for parent in reversed(Path(path).parents) if str(parent) != "/"
+    ]
+    inotify = _inotify_init()
+
+    try:
+        while True:
+            if inotify is not None:
+                libc, fd = inotify
+                # (Re-)add the watches on every wakeup since directories like
+                # /run/user/<uid> are created and mounted over while waiting
+                for parent in parents:
+                    if os.path.isdir(parent):
+                        libc.inotify_add_watch(fd, parent.encode(), _IN_WATCH_MASK)
+
+            if os.path.exists(path) is exists:
+                return True
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+
+            if inotify is None:
+                time.sleep(min(remaining, 0.1))
+                continue
+
+            # mount events are not reported, so wake up regularly regardless
+            if select.select([fd], [], [], min(remaining, 0.5))[0]:
+                try:
+                    while os.read(fd, 4096):
+                        pass
+                except BlockingIOError:
+                    pass
+    finally:
+        if inotify is not None:
+            os.close(inotify[1])
+
+
 def lingering_disable(user):
     """
     Disable lingering for a user.
@@ -377,6 +495,33 @@ def lingering_enabled(user):
     raise CommandExecutionError(f"Failed running loginctl: {out['stderr']}")
 
 
+def lingering_wait(user, enabled=True, timeout=10):
+    """
+    Wait until the session bus of a user has appeared after enabling
+    lingering (or disappeared after disabling it). Returns False if it
+    did not within the timeout.
+
+    CLI Example:
+
+    .. code-block:: bash
+
+        salt '*' user_service.lingering_wait user
+
+    user
+        The user to wait for.
+
+    enabled
+        Wait for the session bus to appear. If False, wait for it to
+        disappear. Defaults to True.
+
+    timeout
+        Maximum time to wait in seconds. Defaults to 10.
+    """
+
+    uid = _user_info(user, "uid")
+    return _wait_for_path(f"/run/user/{uid}/bus", exists=enabled, timeout=timeout)
+
+
 def journal(unit, max_lines=20, user=None):
     """
     Return the last journal log entries for a unit.
@@ -646,7 +791,7 @@ def _systemctl(
         xdg_runtime_dir = f"/run/user/{uid}"
         dbus_session_bus = f"{xdg_runtime_dir}/bus"
 
-        if not Path(dbus_session_bus).exists():
+        if not os.path.exists(dbus_session_bus):
             raise CommandExecutionError(
                 f"User {runas} does not have lingering enabled. This is required "
                 "to run systemctl as a user that does not have a login session."
@@ -700,7 +845,7 @@ def _journalctl(
         xdg_runtime_dir = f"/run/user/{uid}"
         dbus_session_bus = f"{xdg_runtime_dir}/bus"
 
-        if not Path(dbus_session_bus).exists():
+        if not os.path.exists(dbus_session_bus):
             raise CommandExecutionError(
                 f"User {runas} does not have lingering enabled. This is required "
                 "to run systemctl as a user that does not have a login session."
@@ -768,6 +913,24 @@ def _convert_args(args):
     return converted
 
 
+def _wait_until(predicate, timeout):
+    """
+    Helper for polling until predicate returns True, backing off
+    from 10 ms to 250 ms between checks. Returns False on timeout.
+    """
+
+    deadline = time.monotonic() + timeout
+    delay = 0.01
+
+    while not predicate():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        time.sleep(min(delay, remaining))
+        delay = min(delay * 2, 0.25)
+    return True
+
+
 def service_dir(user=None):
     """
     Returns the path of the directory service units should be
@@ -33,26 +33,79 @@ compose.default_container_prefix
     By default, prefix service units for containers with this
     string. Defaults to empty.
 
+compose.trust_enable_result
+    Consider a unit enabled/disabled as soon as ``systemctl enable``/``disable``
+    succeeded instead of querying its state again in
+    ``compose.systemd_service_enabled``/``compose.systemd_service_disabled``.
+    Defaults to True.
+
 Todo:
     * import/export Kubernetes YAML files
 """
+import bisect
 import logging
-import re
-import time
-from pathlib import Path
+from functools import lru_cache as _lru_cache
+from functools import wraps as _wraps
 
 from salt.exceptions import CommandExecutionError, SaltInvocationError
 from salt.utils.args import get_function_argspec as _argspec
 
 log = logging.getLogger(__name__)
 
+trust_enable_result = True
+
+# Argument names of loaded functions only change when the modules are reloaded,
+# which recreates this module as well
+_ARGSPEC_CACHE = {}
+
+
+def __init__(opts):
+    global trust_enable_result
+    trust_enable_result = opts.get("compose.trust_enable_result", trust_enable_result)
+
+
+def _valid_arg_names(func):
+    """
+    Helper that returns (and caches) the argument names of a function.
+    """
+    key = (func.__module__, func.__qualname__)
+    if key not in _ARGSPEC_CACHE:
+        _ARGSPEC_CACHE[key] = frozenset(_argspec(func).args)
+    return _ARGSPEC_CACHE[key]
+
+
+def _compose_state(func):
+    """
+    Decorator for states in this module. Turns errors raised by the
+    execution module into a failed state return, so the states only
+    need to handle the successful paths.
+    """
+
+    @_wraps(func)
+    def compose_state(name, *args, **kwargs):
+        try:
+            return func(name, *args, **kwargs)
+        except (CommandExecutionError, SaltInvocationError) as e:
+            return {"name": name, "changes": {}, "result": False, "comment": str(e)}
+
+    return compose_state
+
 
 def _get_valid_args(func, kwargs):
-    valid_args = _argspec(func).args
+    valid_args = _valid_arg_names(func)
+
+    return {arg: val for arg, val in kwargs.items() if arg in valid_args}
 
-    return {arg: kwargs[arg] for arg in valid_args if arg in kwargs}
 
+def _unit_status(name, user=None):
+    """
+    Look up the cached ``ActiveState``/``UnitFileState`` of a single unit.
+    """
 
+    return next(iter(__salt__["compose.status_many"]([name], user=user).values()))
+
+
+@_compose_state
 def installed(
     name,
     update=True,
@@ -77,6 +130,7 @@ def installed(
     pod_prefix=None,
     container_prefix=None,
     separator=None,
+    parallel=None,
 ):
     """
     Make sure a container composition is installed.
@@ -180,196 +234,185 @@ def installed(
     separator
         Unit name separator between prefix and name/id.
         Depending on the other prefixes, defaults to empty or dash.
+
+    parallel
+        Maximum number of units to act on concurrently. Defaults to 10.
+        A different default can be set in ``compose.parallel``.
     """
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
+    common = {
+        "project_name": project_name,
+        "pod_prefix": pod_prefix,
+        "container_prefix": container_prefix,
+        "separator": separator,
+        "user": user,
+    }
+
+    # Changes in any of these parameters need to trigger a full check
+    params = {
+        "update": update,
+        "create_pod": create_pod,
+        "pod_args": pod_args,
+        "pod_args_override_default": pod_args_override_default,
+        "podman_create_args": podman_create_args,
+        "remove_orphans": remove_orphans,
+        "build": build,
+        "build_args": build_args,
+        "pull": pull,
+        "ephemeral": ephemeral,
+        "restart_policy": restart_policy,
+        "restart_sec": restart_sec,
+        "stop_timeout": stop_timeout,
+        "service_overrides": service_overrides,
+        "pod_wants": pod_wants,
+        "enable": enable,
+        "pod_prefix": pod_prefix,
+        "container_prefix": container_prefix,
+        "separator": separator,
+    }
+
+    handle = __salt__["compose.open"](name, **common)
+
+    # 0. skip everything if the compose file has not been touched
+    #    since the last successful run
+    # 1. see if project has been applied (list installed services?)
+    # 2. check if there are changes (unit files, missing units)
+    # 3. decide whether to apply those changes
+    if not force_recreate and __salt__["compose.is_synced"](handle, params=params):
+        ret[
+            "comment"
+        ] = f"Composition {name} is already installed and in sync with the definitions."
+        return ret
 
-    try:
-        # 1. see if project has been applied (list installed services?)
-        # 2. check if there are changes (unit files, missing units)
-        # 3. decide whether to apply those changes
-        if not force_recreate:
-            is_installed = __salt__["compose.list_installed_units"](
-                name,
-                status_only=True,
-                project_name=project_name,
-                container_prefix=container_prefix,
-                pod_prefix=pod_prefix,
-                separator=separator,
-                user=user,
-            )
+    if not force_recreate and not update:
+        # only the presence of the units matters, skip the change detection
+        is_installed = __salt__["compose.project_status"](
+            handle, check_changes=False, check_state=False
+        )["installed"]
 
-            if is_installed and not update:
-                ret["comment"] = f"Composition {name} is already installed."
-                return ret
-
-            has_changes = __salt__["compose.has_changes"](
-                name,
-                status_only=True,
-                skip_removed=not remove_orphans,
-                project_name=project_name,
-                container_prefix=container_prefix,
-                pod_prefix=pod_prefix,
-                separator=separator,
-                user=user,
-            )
+        if is_installed:
+            ret["comment"] = f"Composition {name} is already installed."
+            return ret
 
-            try:
-                wanted_units = __salt__["compose.install_units"](
-                    name,
-                    pod_prefix=pod_prefix,
-                    container_prefix=container_prefix,
-                    separator=separator,
-                    user=user,
-                    ephemeral=ephemeral,
-                    restart_policy=restart_policy,
-                    restart_sec=restart_sec,
-                    stop_timeout=stop_timeout,
-                    service_overrides=service_overrides,
-                    pod_wants=pod_wants,
-                    generate_only=True,
-                )
-            except SaltInvocationError as err:
-                if "Could not find existing pod or containers" not in str(err):
-                    raise
-                wanted_units = {}
-
-            units_changed = False
-
-            service_dir = Path(__salt__["compose.service_dir"](user))
-            for unit_name, unit_definitions in wanted_units.items():
-                unit_file = str(service_dir / (unit_name + ".service"))
-                if not __salt__["file.file_exists"](unit_file):
-                    units_changed = True
-                    break
-                if __salt__["file.read"](unit_file) != unit_definitions:
-                    units_changed = True
-                    break
+        has_changes = units_changed = False
+    elif not force_recreate:
+        status = __salt__["compose.project_status"](
+            handle,
+            check_changes=True,
+            check_state=False,
+            skip_removed=not remove_orphans,
+            unit_kwargs={
+                "ephemeral": ephemeral,
+                "restart_policy": restart_policy,
+                "restart_sec": restart_sec,
+                "stop_timeout": stop_timeout,
+                "service_overrides": service_overrides,
+                "pod_wants": pod_wants,
+                "parallel": parallel,
+            },
+        )
+        is_installed = status["installed"]
 
-            if is_installed and not has_changes and not units_changed:
-                ret[
-                    "comment"
-                ] = f"Composition {name} is already installed and in sync with the definitions."
-                return ret
-        else:
-            # cheap out for now @TODO
-            is_installed = True
+        # When the composition is not installed, there are always changes
+        # (missing units), so these are only None if they do not matter
+        has_changes = status["has_changes"]
+        units_changed = bool(status["units_changed"])
 
-        if __opts__["test"]:
-            ret["result"] = None
-            ret["comment"] = "Composition {} is set to be {}.".format(
-                name, "installed" if not is_installed else "updated"
-            )
-            ret["changes"]["installed" if not is_installed else "updated"] = name
+        if is_installed and not has_changes and not units_changed:
+            # test runs must not write anything
+            if not __opts__["test"]:
+                __salt__["compose.mark_synced"](handle, params=params)
+            ret[
+                "comment"
+            ] = f"Composition {name} is already installed and in sync with the definitions."
             return ret
+    else:
+        # cheap out for now @TODO
+        is_installed = True
+        has_changes = units_changed = False
+
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = "Composition {} is set to be {}.".format(
+            name, "installed" if not is_installed else "updated"
+        )
+        ret["changes"]["installed" if not is_installed else "updated"] = name
+        return ret
 
-        if has_changes and is_installed:
-            # sometimes, podman-compose fails to remove the containers correctly:
-            #   podman stop -t 10 container
-            #   exit code: 0
-            #   podman rm container
-            #   Error: no container with name or ID "container" found: no such container
-            #   exit code: 1
-            #   podman pod rm pod_container
-            #   exit code: 0
-            #   recreating: done
-            # this is intended to be a workaround
-            log.debug("Updating composition.")
-            log.debug("Removing composition to work around podman-compose up issues.")
-            dead(
-                name,
-                project_name=project_name,
-                pod_prefix=pod_prefix,
-                container_prefix=container_prefix,
-                separator=separator,
-                user=user,
-            )
-            removed(
-                name,
-                volumes=False,
-                project_name=project_name,
-                pod_prefix=pod_prefix,
-                container_prefix=container_prefix,
-                separator=separator,
-                user=user,
-            )
-
-        if units_changed and not has_changes:
-            __salt__["compose.install_units"](
-                name,
-                pod_prefix=pod_prefix,
-                container_prefix=container_prefix,
-                separator=separator,
-                user=user,
-                ephemeral=ephemeral,
-                restart_policy=restart_policy,
-                restart_sec=restart_sec,
-                stop_timeout=stop_timeout,
-                service_overrides=service_overrides,
-                pod_wants=pod_wants,
-                enable_units=enable,
-                now=False,
-            )
-            ret["comment"] = f"Unit files for composition {name} have been updated."
-            ret["changes"]["updated"] = name
-        elif __salt__["compose.install"](
-            name,
-            project_name=project_name,
-            create_pod=create_pod,
-            pod_args=pod_args,
-            pod_args_override_default=pod_args_override_default,
-            podman_create_args=podman_create_args,
-            remove_orphans=remove_orphans,
-            force_recreate=force_recreate,
-            build=build,
-            build_args=build_args,
-            pull=pull,
-            user=user,
-            ephemeral=ephemeral,
-            restart_policy=restart_policy,
-            restart_sec=restart_sec,
-            stop_timeout=stop_timeout,
-            service_overrides=service_overrides,
-            pod_wants=pod_wants,
+    if has_changes and is_installed:
+        # sometimes, podman-compose fails to remove the containers correctly:
+        #   podman stop -t 10 container
+        #   exit code: 0
+        #   podman rm container
+        #   Error: no container with name or ID "container" found: no such container
+        #   exit code: 1
+        #   podman pod rm pod_container
+        #   exit code: 0
+        #   recreating: done
+        # this is intended to be a workaround
+        log.debug("Updating composition.")
+        log.debug("Removing composition to work around podman-compose up issues.")
+        dead(name, **common)
+        removed(name, volumes=False, **common)
+
+    if units_changed and not has_changes:
+        # the definitions have been rendered already during the check
+        __salt__["compose.write_units"](
+            status["wanted_units"],
+            handle,
             enable_units=enable,
             now=False,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-        ):
-            ret["comment"] = "Composition {} has been {}.".format(
-                name, "installed" if not is_installed else "updated"
-            )
-            ret["changes"]["installed" if not is_installed else "updated"] = name
-        else:
-            raise CommandExecutionError(
-                "Something went wrong while trying to {} composition {}. This should not happen.".format(
-                    "install" if not is_installed else "update", name
-                )
+            parallel=parallel,
+        )
+        ret["comment"] = f"Unit files for composition {name} have been updated."
+        ret["changes"]["updated"] = name
+    elif __salt__["compose.install"](
+        handle,
+        create_pod=create_pod,
+        pod_args=pod_args,
+        pod_args_override_default=pod_args_override_default,
+        podman_create_args=podman_create_args,
+        remove_orphans=remove_orphans,
+        force_recreate=force_recreate,
+        build=build,
+        build_args=build_args,
+        pull=pull,
+        ephemeral=ephemeral,
+        restart_policy=restart_policy,
+        restart_sec=restart_sec,
+        stop_timeout=stop_timeout,
+        service_overrides=service_overrides,
+        pod_wants=pod_wants,
+        enable_units=enable,
+        now=False,
+        parallel=parallel,
+    ):
+        ret["comment"] = "Composition {} has been {}.".format(
+            name, "installed" if not is_installed else "updated"
+        )
+        ret["changes"]["installed" if not is_installed else "updated"] = name
+    else:
+        raise CommandExecutionError(
+            "Something went wrong while trying to {} composition {}. This should not happen.".format(
+                "install" if not is_installed else "update", name
             )
+        )
 
-        if __salt__["compose.list_missing_units"](
-            name,
-            status_only=True,
-            project_name=project_name,
-            container_prefix=container_prefix,
-            pod_prefix=pod_prefix,
-            should_have_pod=create_pod,
-            separator=separator,
-            user=user,
-        ):
-            ret["result"] = False
-            ret[
-                "comment"
-            ] = "Tried to install the composition, but there are still some missing components."
-
-    except (CommandExecutionError, SaltInvocationError) as e:
+    if __salt__["compose.list_missing_units"](
+        handle, status_only=True, should_have_pod=create_pod
+    ):
         ret["result"] = False
-        ret["comment"] = str(e)
+        ret[
+            "comment"
+        ] = "Tried to install the composition, but there are still some missing components."
+    else:
+        __salt__["compose.mark_synced"](handle, params=params)
 
     return ret
 
 
+@_compose_state
 def removed(
     name,
     volumes=False,
@@ -418,79 +461,62 @@ def removed(
     """
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
+    common = {
+        "project_name": project_name,
+        "pod_prefix": pod_prefix,
+        "container_prefix": container_prefix,
+        "separator": separator,
+        "user": user,
+    }
+
+    handle = __salt__["compose.open"](name, raise_not_found_error=False, **common)
+
+    if handle is None:
+        ret[
+            "comment"
+        ] = f"Could not find compose file for composition {name}. Assuming it has been removed."
+        return ret
 
-    try:
-        if not __salt__["compose.find_compose_file"](
-            name, user=user, raise_not_found_error=False
-        ):
-            ret[
-                "comment"
-            ] = f"Could not find compose file for composition {name}. Assuming it has been removed."
-            return ret
-
-        # @TODO this does not check for containers belonging to this composition
-        # if the services are not ephemeral
-        if not __salt__["compose.list_installed_units"](
-            name,
-            status_only=True,
-            project_name=project_name,
-            container_prefix=container_prefix,
-            pod_prefix=pod_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["comment"] = f"Composition {name} is already absent."
-            return ret
+    status = __salt__["compose.project_status"](
+        handle, check_changes=False, check_state=False
+    )
 
-        if __opts__["test"]:
-            ret["result"] = None
-            ret["comment"] = f"Composition {name} is set to be removed."
-            if volumes:
-                ret["comment"] += " Volumes are set to be removed as well."
-            ret["changes"]["removed"] = name
-            return ret
+    # @TODO this does not check for containers belonging to this composition
+    # if the services are not ephemeral
+    if not status["installed"]:
+        ret["comment"] = f"Composition {name} is already absent."
+        return ret
 
-        if __salt__["compose.remove"](
-            name,
-            volumes=volumes,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["comment"] = f"Composition {name} has been removed."
-            if volumes:
-                ret["comment"] += " Volumes have been removed as well."
-            ret["changes"]["removed"] = name
-        else:
-            raise CommandExecutionError(
-                f"Something went wrong while trying to remove composition {name}. "
-                "This should not happen."
-            )
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Composition {name} is set to be removed."
+        if volumes:
+            ret["comment"] += " Volumes are set to be removed as well."
+        ret["changes"]["removed"] = name
+        return ret
 
-        if __salt__["compose.list_installed_units"](
-            name,
-            status_only=True,
-            project_name=project_name,
-            container_prefix=container_prefix,
-            pod_prefix=pod_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["result"] = False
-            ret[
-                "comment"
-            ] = "Tried to remove the composition, but some units are still installed."
-            ret["changes"] = {}
+    if __salt__["compose.remove"](handle, volumes=volumes):
+        ret["comment"] = f"Composition {name} has been removed."
+        if volumes:
+            ret["comment"] += " Volumes have been removed as well."
+        ret["changes"]["removed"] = name
+    else:
+        raise CommandExecutionError(
+            f"Something went wrong while trying to remove composition {name}. "
+            "This should not happen."
+        )
 
-    except (CommandExecutionError, SaltInvocationError) as e:
+    if __salt__["compose.list_installed_units"](handle, status_only=True):
         ret["result"] = False
-        ret["comment"] = str(e)
+        ret[
+            "comment"
+        ] = "Tried to remove the composition, but some units are still installed."
+        ret["changes"] = {}
 
     return ret
 
 
+@_compose_state
 def dead(
     name,
     project_name=None,
@@ -499,6 +525,7 @@ def dead(
     separator=None,
     user=None,
     timeout=10,
+    parallel=None,
 ):
     """
     Make sure the installed units for a composition are dead.
@@ -536,90 +563,65 @@ def dead(
         Since only the pod is started explicitly, there is a slight delay for the container
         services. Furthermore, many containers require some time to be reported
         as up. This configures the maximum wait time in seconds. Defaults to 10.
+
+    parallel
+        Maximum number of units to act on concurrently. Defaults to 10.
+        A different default can be set in ``compose.parallel``.
     """
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
+    common = {
+        "project_name": project_name,
+        "pod_prefix": pod_prefix,
+        "container_prefix": container_prefix,
+        "separator": separator,
+        "user": user,
+    }
+
+    handle = __salt__["compose.open"](name, raise_not_found_error=False, **common)
+
+    if handle is None:
+        ret[
+            "comment"
+        ] = f"Could not find compose file for composition {name}. Assuming it has been removed."
+        return ret
 
-    try:
-        if not __salt__["compose.find_compose_file"](
-            name, user=user, raise_not_found_error=False
-        ):
-            ret[
-                "comment"
-            ] = f"Could not find compose file for composition {name}. Assuming it has been removed."
-            return ret
-
-        if not __salt__["compose.list_installed_units"](
-            name,
-            status_only=True,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret[
-                "comment"
-            ] = f"Could not find any installed units for composition {name}."
-            return ret
+    status = __salt__["compose.project_status"](handle, check_changes=False)
 
-        if not __salt__["compose.is_running"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["comment"] = f"Service for {name} is already dead."
-            return ret
+    if not status["installed"]:
+        ret[
+            "comment"
+        ] = f"Could not find any installed units for composition {name}."
+        return ret
 
-        if __opts__["test"]:
-            ret["result"] = None
-            ret["comment"] = f"Service for {name} is set to be stopped."
-            ret["changes"]["stopped"] = name
-            return ret
+    if not status["running"]:
+        ret["comment"] = f"Service for {name} is already dead."
+        return ret
 
-        if __salt__["compose.stop"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["comment"] = f"Service for {name} has been stopped."
-            ret["changes"]["stopped"] = name
-        else:
-            raise CommandExecutionError(
-                f"Something went wrong while trying to stop service for {name}. "
-                "This should not happen."
-            )
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Service for {name} is set to be stopped."
+        ret["changes"]["stopped"] = name
+        return ret
 
-        start_time = time.time()
-
-        while not __salt__["compose.is_dead"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            if time.time() - start_time > timeout:
-                ret["result"] = False
-                ret["comment"] = "Tried to stop the service, but it is still running."
-                ret["changes"] = {}
-                return ret
-            time.sleep(0.25)
+    if __salt__["compose.stop"](handle, parallel=parallel):
+        ret["comment"] = f"Service for {name} has been stopped."
+        ret["changes"]["stopped"] = name
+    else:
+        raise CommandExecutionError(
+            f"Something went wrong while trying to stop service for {name}. "
+            "This should not happen."
+        )
 
-    except (CommandExecutionError, SaltInvocationError) as e:
+    if not __salt__["compose.wait"](handle, running=False, timeout=timeout):
         ret["result"] = False
-        ret["comment"] = str(e)
+        ret["comment"] = "Tried to stop the service, but it is still running."
+        ret["changes"] = {}
 
     return ret
 
 
+@_compose_state
 def disabled(
     name,
     project_name=None,
@@ -661,84 +663,60 @@ def disabled(
     """
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
+    common = {
+        "project_name": project_name,
+        "pod_prefix": pod_prefix,
+        "container_prefix": container_prefix,
+        "separator": separator,
+        "user": user,
+    }
+
+    handle = __salt__["compose.open"](name, raise_not_found_error=False, **common)
+
+    if handle is None:
+        ret[
+            "comment"
+        ] = f"Could not find compose file for composition {name}. Assuming it has been removed."
+        return ret
 
-    try:
-        if not __salt__["compose.find_compose_file"](
-            name, user=user, raise_not_found_error=False
-        ):
-            ret[
-                "comment"
-            ] = f"Could not find compose file for composition {name}. Assuming it has been removed."
-            return ret
-
-        if not __salt__["compose.list_installed_units"](
-            name,
-            status_only=True,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret[
-                "comment"
-            ] = f"Could not find any installed units for composition {name}."
-            return ret
+    status = __salt__["compose.project_status"](handle, check_changes=False)
 
-        if not __salt__["compose.is_enabled"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["comment"] = f"Service for {name} is already disabled."
-            return ret
+    if not status["installed"]:
+        ret[
+            "comment"
+        ] = f"Could not find any installed units for composition {name}."
+        return ret
 
-        if __opts__["test"]:
-            ret["result"] = None
-            ret["comment"] = f"Service for {name} is set to be disabled."
-            ret["changes"]["disabled"] = name
-            return ret
+    if not status["enabled"]:
+        ret["comment"] = f"Service for {name} is already disabled."
+        return ret
 
-        if __salt__["compose.disable"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["comment"] = f"Service for {name} has been disabled."
-            ret["changes"]["disabled"] = name
-        else:
-            raise CommandExecutionError(
-                f"Something went wrong while trying to stop service for {name}. "
-                "This should not happen."
-            )
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Service for {name} is set to be disabled."
+        ret["changes"]["disabled"] = name
+        return ret
 
-        if not __salt__["compose.is_disabled"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["result"] = False
-            ret[
-                "comment"
-            ] = "Tried to disable the service, but it is still reported as enabled."
-            ret["changes"] = {}
+    if __salt__["compose.disable"](handle):
+        ret["comment"] = f"Service for {name} has been disabled."
+        ret["changes"]["disabled"] = name
+    else:
+        raise CommandExecutionError(
+            f"Something went wrong while trying to stop service for {name}. "
+            "This should not happen."
+        )
 
-    except (CommandExecutionError, SaltInvocationError) as e:
+    if not __salt__["compose.is_disabled"](handle):
         ret["result"] = False
-        ret["comment"] = str(e)
+        ret[
+            "comment"
+        ] = "Tried to disable the service, but it is still reported as enabled."
+        ret["changes"] = {}
 
     return ret
 
 
+@_compose_state
 def enabled(
     name,
     project_name=None,
@@ -780,62 +758,45 @@ def enabled(
     """
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
+    common = {
+        "project_name": project_name,
+        "pod_prefix": pod_prefix,
+        "container_prefix": container_prefix,
+        "separator": separator,
+        "user": user,
+    }
+    handle = __salt__["compose.open"](name, **common)
+
+    if __salt__["compose.is_enabled"](handle):
+        ret["comment"] = f"Service for {name} is already enabled."
+        return ret
 
-    try:
-        if __salt__["compose.is_enabled"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["comment"] = f"Service for {name} is already enabled."
-            return ret
-
-        if __opts__["test"]:
-            ret["result"] = None
-            ret["comment"] = f"Service for {name} is set to be enabled."
-            ret["changes"]["enabled"] = name
-            return ret
-
-        if __salt__["compose.enable"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["comment"] = f"Service for {name} has been enabled."
-            ret["changes"]["enabled"] = name
-        else:
-            raise CommandExecutionError(
-                f"Something went wrong while trying to stop service for {name}. "
-                "This should not happen."
-            )
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Service for {name} is set to be enabled."
+        ret["changes"]["enabled"] = name
+        return ret
 
-        if not __salt__["compose.is_enabled"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["result"] = False
-            ret[
-                "comment"
-            ] = "Tried to enable the service, but it is reported as disabled."
-            ret["changes"] = {}
+    if __salt__["compose.enable"](handle):
+        ret["comment"] = f"Service for {name} has been enabled."
+        ret["changes"]["enabled"] = name
+    else:
+        raise CommandExecutionError(
+            f"Something went wrong while trying to stop service for {name}. "
+            "This should not happen."
+        )
 
-    except (CommandExecutionError, SaltInvocationError) as e:
+    if not __salt__["compose.is_enabled"](handle):
         ret["result"] = False
-        ret["comment"] = str(e)
+        ret[
+            "comment"
+        ] = "Tried to enable the service, but it is reported as disabled."
+        ret["changes"] = {}
 
     return ret
 
 
+@_compose_state
 def running(
     name,
     project_name=None,
@@ -844,6 +805,7 @@ def running(
     separator=None,
     user=None,
     timeout=10,
+    parallel=None,
 ):
     """
     Make sure the installed units for a composition are running.
@@ -885,70 +847,50 @@ def running(
         Since only the pod is started explicitly, there is a slight delay for the container
         services. Furthermore, many containers require some time to be reported
         as up. This configures the maximum wait time in seconds. Defaults to 10.
+
+    parallel
+        Maximum number of units to act on concurrently. Defaults to 10.
+        A different default can be set in ``compose.parallel``.
     """
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
+    common = {
+        "project_name": project_name,
+        "pod_prefix": pod_prefix,
+        "container_prefix": container_prefix,
+        "separator": separator,
+        "user": user,
+    }
+    handle = __salt__["compose.open"](name, **common)
+
+    if __salt__["compose.is_running"](handle):
+        ret["comment"] = f"Service for {name} is already running."
+        return ret
 
-    try:
-        if __salt__["compose.is_running"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["comment"] = f"Service for {name} is already running."
-            return ret
-
-        if __opts__["test"]:
-            ret["result"] = None
-            ret["comment"] = f"Service for {name} is set to be started."
-            ret["changes"]["started"] = name
-            return ret
-
-        if __salt__["compose.start"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            ret["comment"] = f"Service for {name} has been started."
-            ret["changes"]["started"] = name
-        else:
-            raise CommandExecutionError(
-                f"Something went wrong while trying to start service for {name}. "
-                "This should not happen."
-            )
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Service for {name} is set to be started."
+        ret["changes"]["started"] = name
+        return ret
 
-        start_time = time.time()
-
-        while not __salt__["compose.is_running"](
-            name,
-            project_name=project_name,
-            pod_prefix=pod_prefix,
-            container_prefix=container_prefix,
-            separator=separator,
-            user=user,
-        ):
-            if time.time() - start_time > timeout:
-                ret["result"] = False
-                ret[
-                    "comment"
-                ] = "Tried to start the service, but it is still not running."
-                ret["changes"] = {}
-                return ret
-            time.sleep(0.25)
+    if __salt__["compose.start"](handle, parallel=parallel):
+        ret["comment"] = f"Service for {name} has been started."
+        ret["changes"]["started"] = name
+    else:
+        raise CommandExecutionError(
+            f"Something went wrong while trying to start service for {name}. "
+            "This should not happen."
+        )
 
-    except (CommandExecutionError, SaltInvocationError) as e:
+    if not __salt__["compose.wait"](handle, running=True, timeout=timeout):
         ret["result"] = False
-        ret["comment"] = str(e)
+        ret["comment"] = "Tried to start the service, but it is still not running."
+        ret["changes"] = {}
 
     return ret
 
 
+@_compose_state
 def lingering_managed(name, enable):
     """
     Manage lingering status for a user.
@@ -964,57 +906,48 @@ def lingering_managed(name, enable):
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
 
-    try:
-        user_info = __salt__["user.info"](name)
-        if not user_info:
-            if __opts__["test"]:
-                ret["result"] = None
-                ret[
-                    "comment"
-                ] = f"User {name} does not exist. If it is created by some state before this, this check will pass."
-                return ret
-            raise SaltInvocationError(f"User {name} does not exist.")
-
-        if enable:
-            func = __salt__["compose.lingering_enable"]
-            verb = "enable"
-        else:
-            func = __salt__["compose.lingering_disable"]
-            verb = "disable"
-
-        if __salt__["compose.lingering_enabled"](name) is enable:
-            ret["comment"] = f"Lingering for user {name} is already {verb}d."
-            return ret
+    user_info = __salt__["user.info"](name)
+    if not user_info:
         if __opts__["test"]:
             ret["result"] = None
-            ret["comment"] = f"Lingering for user {name} is set to be {verb}d."
-            ret["changes"]["lingering"] = enable
-        elif not func(name):
-            raise CommandExecutionError(
-                f"Something went wrong while trying to {verb} lingering for user {name}. "
-                "This should not happen."
-            )
+            ret[
+                "comment"
+            ] = f"User {name} does not exist. If it is created by some state before this, this check will pass."
+            return ret
+        raise SaltInvocationError(f"User {name} does not exist.")
 
-        start = time.time()
-        dbus_session_bus = Path(f"/run/user/{user_info['uid']}/bus")
-        # The enabling lags a bit, which might make other states fail
-        while start - time.time() < 10:
-            if dbus_session_bus.exists() is enable:
-                ret["comment"] = f"Lingering for user {name} has been {verb}d."
-                ret["changes"]["lingering"] = enable
-                return ret
-            time.sleep(0.1)
+    if enable:
+        func = __salt__["compose.lingering_enable"]
+        verb = "enable"
+    else:
+        func = __salt__["compose.lingering_disable"]
+        verb = "disable"
+
+    if __salt__["compose.lingering_enabled"](name) is enable:
+        ret["comment"] = f"Lingering for user {name} is already {verb}d."
+        return ret
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Lingering for user {name} is set to be {verb}d."
+        ret["changes"]["lingering"] = enable
+        return ret
+    if not func(name):
         raise CommandExecutionError(
-            "No errors encountered, but the reported state does not match the expected"
+            f"Something went wrong while trying to {verb} lingering for user {name}. "
+            "This should not happen."
         )
 
-    except (CommandExecutionError, SaltInvocationError) as e:
-        ret["result"] = False
-        ret["comment"] = str(e)
-
+    # The enabling lags a bit, which might make other states fail
+    if not __salt__["user_service.lingering_wait"](name, enabled=enable, timeout=10):
+        raise CommandExecutionError(
+            "No errors encountered, but the reported state does not match the expected"
+        )
+    ret["comment"] = f"Lingering for user {name} has been {verb}d."
+    ret["changes"]["lingering"] = enable
     return ret
 
 
+@_compose_state
 def systemd_service_enabled(
     name,
     user=None,
@@ -1033,48 +966,42 @@ def systemd_service_enabled(
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
 
-    try:
-        if __salt__["compose.systemctl_is_enabled"](
-            name,
-            user=user,
-        ):
-            ret["comment"] = f"Service {name} is already enabled."
-            return ret
+    if "enabled" == _unit_status(name, user)["UnitFileState"]:
+        ret["comment"] = f"Service {name} is already enabled."
+        return ret
 
-        if __opts__["test"]:
-            ret["result"] = None
-            ret["comment"] = f"Service {name} is set to be enabled."
-            ret["changes"]["enabled"] = name
-            return ret
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Service {name} is set to be enabled."
+        ret["changes"]["enabled"] = name
+        return ret
 
-        if __salt__["compose.systemctl_enable"](
-            name,
-            user=user,
-        ):
-            ret["comment"] = f"Service {name} has been enabled."
-            ret["changes"]["enabled"] = name
-        else:
-            raise CommandExecutionError(
-                f"Something went wrong while trying to stop service {name}. This should not happen."
-            )
+    if __salt__["compose.systemctl_enable"](
+        name,
+        user=user,
+    ):
+        ret["comment"] = f"Service {name} has been enabled."
+        ret["changes"]["enabled"] = name
+    else:
+        raise CommandExecutionError(
+            f"Something went wrong while trying to stop service {name}. This should not happen."
+        )
 
-        if not __salt__["compose.systemctl_is_enabled"](
-            name,
-            user=user,
-        ):
-            ret["result"] = False
-            ret[
-                "comment"
-            ] = "Tried to enable the service, but it is reported as disabled."
-            ret["changes"] = {}
+    # systemctl enable fails loudly, so its success is usually enough
+    if trust_enable_result:
+        return ret
 
-    except (CommandExecutionError, SaltInvocationError) as e:
+    if "enabled" != _unit_status(name, user)["UnitFileState"]:
         ret["result"] = False
-        ret["comment"] = str(e)
+        ret[
+            "comment"
+        ] = "Tried to enable the service, but it is reported as disabled."
+        ret["changes"] = {}
 
     return ret
 
 
+@_compose_state
 def systemd_service_running(name, user=None, timeout=10):
     """
     Make sure a systemd unit is running. This is an extension to the
@@ -1094,53 +1021,95 @@ def systemd_service_running(name, user=None, timeout=10):
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
 
-    try:
-        if __salt__["compose.systemctl_is_running"](
-            name,
-            user=user,
-        ):
-            ret["comment"] = f"Service {name} is already running."
-            return ret
+    if _unit_status(name, user)["ActiveState"] in ("active", "reloading"):
+        ret["comment"] = f"Service {name} is already running."
+        return ret
 
-        if __opts__["test"]:
-            ret["result"] = None
-            ret["comment"] = f"Service {name} is set to be started."
-            ret["changes"]["started"] = name
-            return ret
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Service {name} is set to be started."
+        ret["changes"]["started"] = name
+        return ret
 
-        if __salt__["compose.systemctl_start"](
-            name,
-            user=user,
-        ):
-            ret["comment"] = f"Service {name} has been started."
-            ret["changes"]["started"] = name
-        else:
-            raise CommandExecutionError(
-                f"Something went wrong while trying to start service {name}. This should not happen."
-            )
+    if not __salt__["compose.systemctl_transition"](
+        name,
+        "start",
+        timeout=timeout,
+        user=user,
+    ):
+        ret["result"] = False
+        ret["comment"] = "Tried to start the service, but it is still not running."
+        return ret
 
-        start_time = time.time()
+    ret["comment"] = f"Service {name} has been started."
+    ret["changes"]["started"] = name
+    return ret
 
-        while not __salt__["compose.systemctl_is_running"](
-            name,
-            user=user,
-        ):
-            if time.time() - start_time > timeout:
-                ret["result"] = False
-                ret[
-                    "comment"
-                ] = "Tried to start the service, but it is still not running."
-                ret["changes"] = {}
-                return ret
-            time.sleep(0.25)
 
-    except (CommandExecutionError, SaltInvocationError) as e:
-        ret["result"] = False
-        ret["comment"] = str(e)
+@_compose_state
+def systemd_services_running(name, units, user=None, timeout=10, parallel=None):
+    """
+    Make sure several systemd units are running. Units that are not
+    running yet are started concurrently. This is an extension to the
+    official module, which allows to manage services for arbitrary user accounts.
+    This does not support mod_watch behavior.
+
+    name
+        An arbitrary name for this state.
+
+    units
+        List of names of the systemd units.
+
+    user
+        User account the units should be running for. Defaults to Salt process user.
+
+    timeout
+        This state checks whether the services were started successfully. This configures
+        the maximum wait time in seconds for each of them. Defaults to 10.
+
+    parallel
+        Maximum number of units to start concurrently.
+        Defaults to ``compose.parallel``.
+    """
 
+    ret = {"name": name, "changes": {}, "result": True, "comment": ""}
+
+    status = __salt__["compose.status_many"](units, user=user)
+    stopped = [
+        unit
+        for unit, state in status.items()
+        if state["ActiveState"] not in ("active", "reloading")
+    ]
+
+    if not stopped:
+        ret["comment"] = "All services are already running."
+        return ret
+
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Services {', '.join(stopped)} are set to be started."
+        ret["changes"]["started"] = stopped
+        return ret
+
+    results = __salt__["compose.systemctl_transition_many"](
+        stopped, "start", timeout=timeout, user=user, parallel=parallel
+    )
+    started = [unit for unit, success in results.items() if success]
+    failed = [unit for unit, success in results.items() if not success]
+
+    if started:
+        ret["changes"]["started"] = started
+    if failed:
+        ret["result"] = False
+        ret["comment"] = (
+            f"Tried to start services {', '.join(failed)}, but they are still not running."
+        )
+    else:
+        ret["comment"] = f"Services {', '.join(started)} have been started."
     return ret
 
 
+@_compose_state
 def systemd_service_disabled(
     name,
     user=None,
@@ -1159,48 +1128,42 @@ def systemd_service_disabled(
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
 
-    try:
-        if not __salt__["compose.systemctl_is_enabled"](
-            name,
-            user=user,
-        ):
-            ret["comment"] = f"Service {name} is already disabled."
-            return ret
+    if "enabled" != _unit_status(name, user)["UnitFileState"]:
+        ret["comment"] = f"Service {name} is already disabled."
+        return ret
 
-        if __opts__["test"]:
-            ret["result"] = None
-            ret["comment"] = f"Service {name} is set to be disabled."
-            ret["changes"]["disabled"] = name
-            return ret
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Service {name} is set to be disabled."
+        ret["changes"]["disabled"] = name
+        return ret
 
-        if __salt__["compose.systemctl_disable"](
-            name,
-            user=user,
-        ):
-            ret["comment"] = f"Service {name} has been disabled."
-            ret["changes"]["disabled"] = name
-        else:
-            raise CommandExecutionError(
-                f"Something went wrong while trying to stop service {name}. This should not happen."
-            )
+    if __salt__["compose.systemctl_disable"](
+        name,
+        user=user,
+    ):
+        ret["comment"] = f"Service {name} has been disabled."
+        ret["changes"]["disabled"] = name
+    else:
+        raise CommandExecutionError(
+            f"Something went wrong while trying to stop service {name}. This should not happen."
+        )
 
-        if __salt__["compose.systemctl_is_enabled"](
-            name,
-            user=user,
-        ):
-            ret["result"] = False
-            ret[
-                "comment"
-            ] = "Tried to disable the service, but it is reported as enabled."
-            ret["changes"] = {}
+    # systemctl disable fails loudly, so its success is usually enough
+    if trust_enable_result:
+        return ret
 
-    except (CommandExecutionError, SaltInvocationError) as e:
+    if "enabled" == _unit_status(name, user)["UnitFileState"]:
         ret["result"] = False
-        ret["comment"] = str(e)
+        ret[
+            "comment"
+        ] = "Tried to disable the service, but it is reported as enabled."
+        ret["changes"] = {}
 
     return ret
 
 
+@_compose_state
 def systemd_service_dead(name, user=None, timeout=10):
     """
     Make sure a systemd unit is dead. This is an extension to the
@@ -1220,48 +1183,28 @@ def systemd_service_dead(name, user=None, timeout=10):
 
     ret = {"name": name, "changes": {}, "result": True, "comment": ""}
 
-    try:
-        if not __salt__["compose.systemctl_is_running"](
-            name,
-            user=user,
-        ):
-            ret["comment"] = f"Service {name} is already dead."
-            return ret
-
-        if __opts__["test"]:
-            ret["result"] = None
-            ret["comment"] = f"Service {name} is set to be stopped."
-            ret["changes"]["stopped"] = name
-            return ret
-
-        if __salt__["compose.systemctl_stop"](
-            name,
-            user=user,
-        ):
-            ret["comment"] = f"Service {name} has been stopped."
-            ret["changes"]["stopped"] = name
-        else:
-            raise CommandExecutionError(
-                f"Something went wrong while trying to stop service {name}. This should not happen."
-            )
-
-        start_time = time.time()
+    if _unit_status(name, user)["ActiveState"] not in ("active", "reloading"):
+        ret["comment"] = f"Service {name} is already dead."
+        return ret
 
-        while __salt__["compose.systemctl_is_running"](
-            name,
-            user=user,
-        ):
-            if time.time() - start_time > timeout:
-                ret["result"] = False
-                ret["comment"] = "Tried to stop the service, but it is still running."
-                ret["changes"] = {}
-                return ret
-            time.sleep(0.25)
+    if __opts__["test"]:
+        ret["result"] = None
+        ret["comment"] = f"Service {name} is set to be stopped."
+        ret["changes"]["stopped"] = name
+        return ret
 
-    except (CommandExecutionError, SaltInvocationError) as e:
+    if not __salt__["compose.systemctl_transition"](
+        name,
+        "stop",
+        timeout=timeout,
+        user=user,
+    ):
         ret["result"] = False
-        ret["comment"] = str(e)
+        ret["comment"] = "Tried to stop the service, but it is still running."
+        return ret
 
+    ret["comment"] = f"Service {name} has been stopped."
+    ret["changes"]["stopped"] = name
     return ret
 
 
@@ -1281,14 +1224,14 @@ def mod_watch(name, sfun=None, **kwargs):
 
                 if __salt__["compose.is_running"](name, **status_kwargs):
                     func = __salt__["compose.stop"]
-                    check_func = __salt__["compose.is_dead"]
+                    wait_running = False
                 else:
                     ret["comment"] = "Service is already stopped."
                     return ret
 
             # "running" == sfun evidently
             else:
-                check_func = __salt__["compose.is_running"]
+                wait_running = True
                 if __salt__["compose.is_running"](name, **status_kwargs):
                     verb = "restart"
                     func = __salt__["compose.restart"]
@@ -1317,7 +1260,7 @@ def mod_watch(name, sfun=None, **kwargs):
             verb = "recreate"
             pp_suffix = "d"
             func = __salt__["compose.install"]
-            check_func = False
+            wait_running = None
 
         else:
             ret["comment"] = f"Unable to trigger watch for compose.{sfun}"
@@ -1333,19 +1276,15 @@ def mod_watch(name, sfun=None, **kwargs):
         func_kwargs = _get_valid_args(func, kwargs)
         func(name, **func_kwargs)
 
-        if check_func:
-            timeout = kwargs.get("timeout", 10)
-            start_time = time.time()
-
-            while not check_func(name, **status_kwargs):
-                if time.time() - start_time > timeout:
-                    ret["result"] = False
-                    ret[
-                        "comment"
-                    ] = f"Tried to {verb} the service, but it is still not {sfun}."
-                    ret["changes"] = {}
-                    return ret
-                time.sleep(0.25)
+        if wait_running is not None:
+            wait_kwargs = _get_valid_args(__salt__["compose.wait"], kwargs)
+            wait_kwargs["running"] = wait_running
+
+            if not __salt__["compose.wait"](name, **wait_kwargs):
+                ret["result"] = False
+                ret["comment"] = f"Tried to {verb} the service, but it is still not {sfun}."
+                ret["changes"] = {}
+                return ret
 
     except (CommandExecutionError, SaltInvocationError) as e:
         ret["result"] = False
@@ -1358,22 +1297,15 @@ def mod_watch(name, sfun=None, **kwargs):
     return ret
 
 
-def file_copy(
-    name,
-    project,
-    container_ref=None,
-    fail_kwargs=None,
-    **kwargs,
-):
-    """
-    Wrapper for ``file.copy`` that allows to manage owners from the perspective
+_FILE_WRAPPER_DOC = """
+    Wrapper for ``file.{func}`` that allows to manage owners from the perspective
     of the container. This requires the container to be installed or running
     and ``user``/``group`` to be set using IDs instead of names (except ``root``,
     which is mapped to ``0``). If it is not running, only non-remapped IDs,
     ``userns=keep-id`` or ``uidmap``/``gidmap`` can be resolved.
 
     name
-        Name of the directory to manage.
+        Name of the file or directory to manage.
 
     project
         Either the absolute path to a composition file or a project name.
@@ -1387,191 +1319,66 @@ def file_copy(
         kwargs with this dictionary and still execute the state call.
 
     kwargs
-        Other kwargs will be passed through to ``file.copy``.
+        Other kwargs will be passed through to ``file.{func}``.
     """
-    return __states__["file.copy"](
-        name, **_resolve_owner(project, container_ref, fail_kwargs, kwargs)
-    )
 
 
-def file_directory(
-    name,
-    project,
-    container_ref=None,
-    fail_kwargs=None,
-    **kwargs,
-):
+def _make_file_wrapper(func):
     """
-    Wrapper for ``file.directory`` that allows to manage owners from the perspective
-    of the container. This requires the container to be installed or running
-    and ``user``/``group`` to be set using IDs instead of names (except ``root``,
-    which is mapped to ``0``). If it is not running, only non-remapped IDs,
-    ``userns=keep-id`` or ``uidmap``/``gidmap`` can be resolved.
-
-    name
-        Name of the directory to manage.
-
-    project
-        Either the absolute path to a composition file or a project name.
-
-    container_ref
-        Match specific project container by substring in a name.
-        Optional.
-
-    fail_kwargs
-        Instead of failing when a container is not running, update the
-        kwargs with this dictionary and still execute the state call.
-
-    kwargs
-        Other kwargs will be passed through to ``file.directory``.
-    """
-    return __states__["file.directory"](
-        name, **_resolve_owner(project, container_ref, fail_kwargs, kwargs)
-    )
-
-
-def file_managed(
-    name,
-    project,
-    container_ref=None,
-    fail_kwargs=None,
-    **kwargs,
-):
+    Create a ``file_<func>`` state that resolves container owners
+    before passing through to ``file.<func>``.
     """
-    Wrapper for ``file.managed`` that allows to manage owners from the perspective
-    of the container. This requires the container to be installed or running
-    and ``user``/``group`` to be set using IDs instead of names (except ``root``,
-    which is mapped to ``0``). If it is not running, only non-remapped IDs,
-    ``userns=keep-id`` or ``uidmap``/``gidmap`` can be resolved.
+    state = f"file.{func}"
+
+    def wrapper(
+        name,
+        project,
+        container_ref=None,
+        fail_kwargs=None,
+        **kwargs,
+    ):
+        return __states__[state](
+            name, **_resolve_owner(project, container_ref, fail_kwargs, kwargs)
+        )
 
-    name
-        Name of the directory to manage.
+    wrapper.__name__ = wrapper.__qualname__ = f"file_{func}"
+    wrapper.__doc__ = _FILE_WRAPPER_DOC.format(func=func)
+    return wrapper
 
-    project
-        Either the absolute path to a composition file or a project name.
 
-    container_ref
-        Match specific project container by substring in a name.
-        Optional.
+file_copy = _make_file_wrapper("copy")
+file_directory = _make_file_wrapper("directory")
+file_managed = _make_file_wrapper("managed")
+file_recurse = _make_file_wrapper("recurse")
+file_serialize = _make_file_wrapper("serialize")
+file_symlink = _make_file_wrapper("symlink")
 
-    fail_kwargs
-        Instead of failing when a container is not running, update the
-        kwargs with this dictionary and still execute the state call.
 
-    kwargs
-        Other kwargs will be passed through to ``file.managed``.
+@_lru_cache(maxsize=None)
+def _parse_keep_id(userns):
     """
-    return __states__["file.managed"](
-        name, **_resolve_owner(project, container_ref, fail_kwargs, kwargs)
-    )
-
-
-def file_recurse(
-    name,
-    project,
-    container_ref=None,
-    fail_kwargs=None,
-    **kwargs,
-):
+    Helper that parses the UID/GID the user is mapped to from a
+    ``keep-id[:uid=<uid>,gid=<gid>]`` userns value. Unspecified ones are None.
     """
-    Wrapper for ``file.recurse`` that allows to manage owners from the perspective
-    of the container. This requires the container to be installed or running
-    and ``user``/``group`` to be set using IDs instead of names (except ``root``,
-    which is mapped to ``0``). If it is not running, only non-remapped IDs,
-    ``userns=keep-id`` or ``uidmap``/``gidmap`` can be resolved.
 
-    name
-        Name of the directory to manage.
-
-    project
-        Either the absolute path to a composition file or a project name.
-
-    container_ref
-        Match specific project container by substring in a name.
-        Optional.
-
-    fail_kwargs
-        Instead of failing when a container is not running, update the
-        kwargs with this dictionary and still execute the state call.
-
-    kwargs
-        Other kwargs will be passed through to ``file.recurse``.
-    """
-    return __states__["file.recurse"](
-        name, **_resolve_owner(project, container_ref, fail_kwargs, kwargs)
+    params = dict(
+        defn.split("=", 1)
+        for defn in userns[len("keep-id") :].lstrip(":").split(",")
+        if "=" in defn
     )
+    cnt_user = int(params["uid"]) if "uid" in params else None
+    cnt_group = int(params["gid"]) if "gid" in params else None
+    return cnt_user, cnt_group
 
 
-def file_serialize(
-    name,
-    project,
-    container_ref=None,
-    fail_kwargs=None,
-    **kwargs,
-):
+def _host_idmap(project, kind):
     """
-    Wrapper for ``file.serialize`` that allows to manage owners from the perspective
-    of the container. This requires the container to be installed or running
-    and ``user``/``group`` to be set using IDs instead of names (except ``root``,
-    which is mapped to ``0``). If it is not running, only non-remapped IDs,
-    ``userns=keep-id`` or ``uidmap``/``gidmap`` can be resolved.
-
-    name
-        Name of the directory to manage.
-
-    project
-        Either the absolute path to a composition file or a project name.
-
-    container_ref
-        Match specific project container by substring in a name.
-        Optional.
-
-    fail_kwargs
-        Instead of failing when a container is not running, update the
-        kwargs with this dictionary and still execute the state call.
-
-    kwargs
-        Other kwargs will be passed through to ``file.serialize``.
-    """
-    return __states__["file.serialize"](
-        name, **_resolve_owner(project, container_ref, fail_kwargs, kwargs)
-    )
-
-
-def file_symlink(
-    name,
-    project,
-    container_ref=None,
-    fail_kwargs=None,
-    **kwargs,
-):
+    Helper that returns the ``uid``/``gid`` map of the user namespace a project
+    runs in. ``compose.idmaps`` caches both maps since it requires spawning
+    ``podman unshare``.
     """
-    Wrapper for ``file.symlink`` that allows to manage owners from the perspective
-    of the container. This requires the container to be installed or running
-    and ``user``/``group`` to be set using IDs instead of names (except ``root``,
-    which is mapped to ``0``). If it is not running, only non-remapped IDs,
-    ``userns=keep-id`` or ``uidmap``/``gidmap`` can be resolved.
-
-    name
-        Name of the directory to manage.
-
-    project
-        Either the absolute path to a composition file or a project name.
-
-    container_ref
-        Match specific project container by substring in a name.
-        Optional.
 
-    fail_kwargs
-        Instead of failing when a container is not running, update the
-        kwargs with this dictionary and still execute the state call.
-
-    kwargs
-        Other kwargs will be passed through to ``file.symlink``.
-    """
-    return __states__["file.symlink"](
-        name, **_resolve_owner(project, container_ref, fail_kwargs, kwargs)
-    )
+    return SubID.from_tuples(__salt__["compose.idmaps"](project)[kind])
 
 
 def _resolve_owner(project, container_ref, fail_kwargs, kwargs):
@@ -1580,6 +1387,10 @@ def _resolve_owner(project, container_ref, fail_kwargs, kwargs):
     parameters to container UID/GID.
     """
 
+    if "user" not in kwargs and "group" not in kwargs:
+        # nothing to resolve, avoid inspecting the containers
+        return kwargs
+
     def check_fail(msg=""):
         err_msg = msg or (
             f"Could not find any container with ref '{container_ref}' "
@@ -1591,100 +1402,109 @@ def _resolve_owner(project, container_ref, fail_kwargs, kwargs):
         kwargs.update(fail_kwargs)
         return kwargs
 
-    cnt_info = __salt__["compose.inspect"](project, name=container_ref)
-    idmap_host = {"uid": None, "gid": None}
-    if cnt_info:
-        cnt_info = cnt_info[0]
-        cnt_idmap = cnt_info["HostConfig"].get(
-            "IDMappings", {"GidMap": [], "UidMap": []}
-        )
+    # The mappings do not depend on the file, so they are looked up once
+    # per project container. compose.install/remove drop them.
+    contextkey = f"compose._resolve_owner.{project}.{container_ref}"
+    if contextkey in __context__:
+        id_maps = __context__[contextkey]
     else:
-        # This means the container is not running, we can try to
-        # inspect the service units for expected ID remappings
-        units = __salt__["compose.list_installed_units"](project)
-        if not units:
-            return check_fail()
-        userns = ""
-        uidmap_unit = []
-        gidmap_unit = []
-        if units.get("pods"):
-            # If a pod is in use, it will carry the remap defs
-            pod_info = __salt__["compose.inspect_unit"](
-                units["pods"][next(iter(units["pods"]))]
+        cnt_info = __salt__["compose.inspect"](project, name=container_ref)
+        idmap_host = {"uid": None, "gid": None}
+        if cnt_info:
+            cnt_info = cnt_info[0]
+            cnt_idmap = cnt_info["HostConfig"].get(
+                "IDMappings", {"GidMap": [], "UidMap": []}
             )
-            if "userns" in pod_info["options"]:
-                userns = pod_info["options"]["userns"]
-            else:
-                if "uidmap" in pod_info["options"]:
-                    uidmap_unit = pod_info["options"]["uidmap"]
-                if "gidmap" in pod_info["options"]:
-                    gidmap_unit = pod_info["options"]["gidmap"]
         else:
-            # Otherwise, look through the container unit definitions
-            for cnt in units.get("containers", []):
-                if container_ref is not None and container_ref not in cnt:
-                    continue
-                # `raw` because `inspect_unit` tries to render `podman.ps` output
-                # for containers otherwise
-                cnt_info = __salt__["compose.inspect_unit"](cnt, raw=True)
-                if "userns" in cnt_info["options"]:
-                    userns = cnt_info["options"]["userns"]
+            # This means the container is not running, we can try to
+            # inspect the service units for expected ID remappings
+            units = __salt__["compose.list_installed_units"](project)
+            if not units:
+                return check_fail()
+            userns = ""
+            uidmap_unit = []
+            gidmap_unit = []
+            if units.get("pods"):
+                # If a pod is in use, it will carry the remap defs
+                pod_info = __salt__["compose.inspect_unit"](
+                    next(iter(units["pods"].values()))
+                )
+                if "userns" in pod_info["options"]:
+                    userns = pod_info["options"]["userns"]
                 else:
-                    if "uidmap" in cnt_info["options"]:
-                        uidmap_unit = cnt_info["options"]["uidmap"]
-                    if "gidmap" in cnt_info["options"]:
-                        gidmap_unit = cnt_info["options"]["gidmap"]
-                break
-
-        # Format possibly discovered remap defs as podman inspect would return
-        if uidmap_unit or gidmap_unit:
-            cnt_idmap = {"GidMap": gidmap_unit, "UidMap": uidmap_unit}
-        elif userns.startswith("keep-id"):
-            userns = userns[7:]
-            cnt_user = None
-            cnt_group = None
-            if userns.startswith(":"):
-                for defn in userns.split(","):
-                    param, val = defn.split("=")
-                    if param == "uid":
-                        cnt_user = int(val)
-                    elif param == "gid":
-                        cnt_group = int(val)
-            if cnt_user is None or cnt_group is None:
-                # If uid/gid were not specified, we need to discover the
-                # user's uid/gid to know which ID the user will receive
-                # inside the container
-                project_info = __salt__["compose.project_info"](project)
-                if not project_info["user"]:
-                    return check_fail(
-                        f"Could not determine associated user from project '{project}'"
-                    )
-                user_info = __salt__["user.info"](project_info["user"])
-                cnt_user = cnt_user if cnt_user is not None else user_info["uid"]
-                cnt_group = cnt_group if cnt_group is not None else user_info["gid"]
-            # We need the host maps to discover the number of IDs, save them for later
-            idmap_host["uid"] = SubID.from_str(
-                __salt__["compose.unshare"](project, "cat /proc/self/uid_map")
-            )
-            idmap_host["gid"] = SubID.from_str(
-                __salt__["compose.unshare"](project, "cat /proc/self/gid_map")
+                    if "uidmap" in pod_info["options"]:
+                        uidmap_unit = pod_info["options"]["uidmap"]
+                    if "gidmap" in pod_info["options"]:
+                        gidmap_unit = pod_info["options"]["gidmap"]
+            else:
+                # Otherwise, look through the container unit definitions
+                for cnt in units.get("containers", []):
+                    if container_ref is not None and container_ref not in cnt:
+                        continue
+                    # `raw` because `inspect_unit` tries to render `podman.ps` output
+                    # for containers otherwise
+                    cnt_info = __salt__["compose.inspect_unit"](cnt, raw=True)
+                    if "userns" in cnt_info["options"]:
+                        userns = cnt_info["options"]["userns"]
+                    else:
+                        if "uidmap" in cnt_info["options"]:
+                            uidmap_unit = cnt_info["options"]["uidmap"]
+                        if "gidmap" in cnt_info["options"]:
+                            gidmap_unit = cnt_info["options"]["gidmap"]
+                    break
+
+            # Format possibly discovered remap defs as podman inspect would return
+            if uidmap_unit or gidmap_unit:
+                cnt_idmap = {"GidMap": gidmap_unit, "UidMap": uidmap_unit}
+            elif userns.startswith("keep-id"):
+                cnt_user, cnt_group = _parse_keep_id(userns)
+                if cnt_user is None or cnt_group is None:
+                    # If uid/gid were not specified, we need to discover the
+                    # user's uid/gid to know which ID the user will receive
+                    # inside the container
+                    project_info = __salt__["compose.project_info"](project)
+                    if not project_info["user"]:
+                        return check_fail(
+                            f"Could not determine associated user from project '{project}'"
+                        )
+                    user_info = __salt__["user.info"](project_info["user"])
+                    cnt_user = cnt_user if cnt_user is not None else user_info["uid"]
+                    cnt_group = cnt_group if cnt_group is not None else user_info["gid"]
+                # We need the host maps to discover the number of IDs, save them for later
+                idmap_host["uid"] = _host_idmap(project, "uid")
+                idmap_host["gid"] = _host_idmap(project, "gid")
+                # Calculate final internal idmap. keep-id spreads the subordinate
+                # IDs (all but the one the user itself is mapped to) around the user.
+                subgids = idmap_host["gid"].size() - 1
+                subuids = idmap_host["uid"].size() - 1
+                cnt_idmap = {
+                    "GidMap": [
+                        (0, 1, cnt_group),
+                        (cnt_group, 0, 1),
+                        (cnt_group + 1, cnt_group + 1, subgids - cnt_group),
+                    ],
+                    "UidMap": [
+                        (0, 1, cnt_user),
+                        (cnt_user, 0, 1),
+                        (cnt_user + 1, cnt_user + 1, subuids - cnt_user),
+                    ],
+                }
+            else:
+                # Nothing was overridden (or we don't know about the `userns` value)
+                cnt_idmap = {"GidMap": [], "UidMap": []}
+
+        # Map of internal => effective ID and effective => host ID per entity.
+        # Maps from podman inspect are strings, calculated ones are tuples already.
+        id_maps = {}
+        for ent in ("user", "group"):
+            int_map = cnt_idmap.get(f"{ent[0].upper()}idMap", [])
+            id_maps[ent] = (
+                SubID.from_tuples(int_map)
+                if int_map and isinstance(int_map[0], tuple)
+                else SubID.from_inspect(int_map),
+                idmap_host[f"{ent[0]}id"] or _host_idmap(project, f"{ent[0]}id"),
             )
-            # Calculate final internal idmap
-            cnt_idmap = {
-                "GidMap": [
-                    f"0:1:{cnt_group}",
-                    f"{cnt_group}:0:1",
-                    f"{cnt_group+1}:{cnt_group+1}:{idmap_host['gid'].size() - cnt_group}",
-                ],
-                "UidMap": [
-                    f"0:1:{cnt_user}",
-                    f"{cnt_user}:0:1",
-                    f"{cnt_user+1}:{cnt_user+1}:{idmap_host['uid'].size() - cnt_user}",
-                ],
-            }
-        else:
-            # Nothing was overridden (or we don't know about the `userns` value)
-            cnt_idmap = {"GidMap": [], "UidMap": []}
+        __context__[contextkey] = id_maps
 
     for ent in ("user", "group"):
         if ent in kwargs:
@@ -1700,10 +1520,7 @@ def _resolve_owner(project, container_ref, fail_kwargs, kwargs):
 
             # This accounts for maps other than ``--userns=host``, e.g. ``keep-id``
             # or custom maps.
-            int_id_map = SubID.from_inspect(cnt_idmap.get(f"{ent[0].upper()}idMap", []))
-            id_map = idmap_host[f"{ent[0]}id"] or SubID.from_str(
-                __salt__["compose.unshare"](project, f"cat /proc/self/{ent[0]}id_map")
-            )
+            int_id_map, id_map = id_maps[ent]
             eff_id = int_id_map.find_parent_id(wanted_id)
             log.debug(f"Found effective (internal) {ent} ID: {wanted_id} => {eff_id}")
             final_id = id_map.find_parent_id(eff_id)
@@ -1716,7 +1533,9 @@ class SubID:
     submap = None
 
     def __init__(self, submap):
-        self.submap = submap
+        # sorted by start ID inside the namespace for find_parent_id
+        self.submap = tuple(sorted(submap))
+        self._starts = tuple(pid_start for pid_start, _, _ in self.submap)
 
     @staticmethod
     def from_str(submap):
@@ -1725,12 +1544,19 @@ class SubID:
         """
         return SubID(
             tuple(
-                tuple(map(int, re.split(r"[\s]+", line.strip())))
+                tuple(map(int, line.split()))
                 for line in submap.splitlines()
                 if line
             )
         )
 
+    @staticmethod
+    def from_tuples(submap):
+        """
+        Create a SubID object from ``(inside, outside, count)`` triples.
+        """
+        return SubID(tuple(tuple(line) for line in submap))
+
     @staticmethod
     def from_inspect(submap):
         """
@@ -1740,16 +1566,24 @@ class SubID:
         return SubID(tuple(tuple(map(int, line.split(":"))) for line in submap))
 
     def find_parent_id(self, fid):
+        """
+        Map an ID inside the namespace to its parent ID. The range containing
+        ``fid`` is looked up by bisecting the sorted start IDs, so maps with
+        several ranges (e.g. ``0 1000 1`` + ``1 100000 65536``) resolve
+        ``0`` to ``1000`` and ``1`` to ``100000``. Raises SaltInvocationError
+        for IDs outside of all ranges.
+        """
         if not self.submap:
             return fid
-        for pid_start, parent_start, cnt in self.submap:
-            if fid in range(pid_start, pid_start + cnt):
+        idx = bisect.bisect_right(self._starts, fid) - 1
+        if idx >= 0:
+            pid_start, parent_start, cnt = self.submap[idx]
+            if pid_start <= fid < pid_start + cnt:
                 return parent_start + fid - pid_start
         raise SaltInvocationError("No such ID defined")
 
     def size(self):
-        largest = 0
-        for _, _, cnt in self.submap:
-            if cnt > largest:
-                largest = cnt
-        return largest
+        """
+        Return the total number of IDs mapped.
+        """
+        return sum(cnt for _, _, cnt in self.submap)
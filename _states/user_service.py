@@ -12,8 +12,6 @@ I forgot which problems I had using this method though.
 https://github.com/saltstack/salt/issues/40887
 """
 
-import time
-from pathlib import Path
 from salt.exceptions import CommandExecutionError, SaltInvocationError
 from salt.utils.args import get_function_argspec as _argspec
 
@@ -64,24 +62,20 @@ def lingering_managed(name, enable):
             ret["result"] = None
             ret["comment"] = f"Lingering for user {name} is set to be {verb}d."
             ret["changes"]["lingering"] = enable
-        elif not func(name):
+            return ret
+        if not func(name):
             raise CommandExecutionError(
                 f"Something went wrong while trying to {verb} lingering for user {name}. "
                 "This should not happen."
             )
 
-        start = time.time()
-        dbus_session_bus = Path(f"/run/user/{user_info['uid']}/bus")
         # The enabling lags a bit, which might make other states fail
-        while start - time.time() < 10:
-            if dbus_session_bus.exists() is enable:
-                ret["comment"] = f"Lingering for user {name} has been {verb}d."
-                ret["changes"]["lingering"] = enable
-                return ret
-            time.sleep(0.1)
-        raise CommandExecutionError(
-            "No errors encountered, but the reported state does not match the expected"
-        )
+        if not __salt__["user_service.lingering_wait"](name, enabled=enable, timeout=10):
+            raise CommandExecutionError(
+                "No errors encountered, but the reported state does not match the expected"
+            )
+        ret["comment"] = f"Lingering for user {name} has been {verb}d."
+        ret["changes"]["lingering"] = enable
 
     except (CommandExecutionError, SaltInvocationError) as e:
         ret["result"] = False
@@ -226,20 +220,12 @@ def running(name, user=None, enable=None, timeout=10):
         if running:
             return ret
 
-        start_time = time.time()
-
-        while not __salt__["user_service.is_running"](
-            name,
-            user=user,
+        if not __salt__["user_service.wait"](
+            name, running=True, timeout=timeout, user=user
         ):
-            if time.time() - start_time > timeout:
-                ret["result"] = False
-                ret[
-                    "comment"
-                ] = "Tried to start the service, but it is still not running."
-                ret["changes"].pop("started")
-                return ret
-            time.sleep(0.25)
+            ret["result"] = False
+            ret["comment"] = "Tried to start the service, but it is still not running."
+            ret["changes"].pop("started")
 
     except (CommandExecutionError, SaltInvocationError) as e:
         ret["result"] = False
@@ -388,18 +374,12 @@ def dead(name, user=None, enable=None, timeout=10):
         if not running:
             return ret
 
-        start_time = time.time()
-
-        while __salt__["user_service.is_running"](
-            name,
-            user=user,
+        if not __salt__["user_service.wait"](
+            name, running=False, timeout=timeout, user=user
         ):
-            if time.time() - start_time > timeout:
-                ret["result"] = False
-                ret["comment"] = "Tried to stop the service, but it is still running."
-                ret["changes"] = {}
-                return ret
-            time.sleep(0.25)
+            ret["result"] = False
+            ret["comment"] = "Tried to stop the service, but it is still running."
+            ret["changes"] = {}
 
     except (CommandExecutionError, SaltInvocationError) as e:
         ret["result"] = False
@@ -423,14 +403,14 @@ def mod_watch(name, sfun=None, reload=False, **kwargs):
 
                 if __salt__["user_service.is_running"](name, **status_kwargs):
                     func = __salt__["user_service.stop"]
-                    check_func = __salt__["user_service.is_dead"]
+                    wait_running = False
                 else:
                     ret["comment"] = "Service is already stopped."
                     return ret
 
             # "running" == sfun evidently
             else:
-                check_func = __salt__["user_service.is_running"]
+                wait_running = True
                 if __salt__["user_service.is_running"](name, **status_kwargs):
                     verb = "reload" if reload else "restart"
                     func = __salt__[f"user_service.{verb}"]
@@ -453,17 +433,17 @@ def mod_watch(name, sfun=None, reload=False, **kwargs):
         func(name, **func_kwargs)
 
         timeout = kwargs.get("timeout", 10)
-        start_time = time.time()
 
-        while not check_func(name, **status_kwargs):
-            if time.time() - start_time > timeout:
-                ret["result"] = False
-                ret[
-                    "comment"
-                ] = f"Tried to {verb} the service, but it is still not {sfun}."
-                ret["changes"] = {}
-                return ret
-            time.sleep(0.25)
+        if not __salt__["user_service.wait"](
+            name,
+            running=wait_running,
+            timeout=timeout,
+            user=status_kwargs.get("user"),
+        ):
+            ret["result"] = False
+            ret["comment"] = f"Tried to {verb} the service, but it is still not {sfun}."
+            ret["changes"] = {}
+            return ret
 
     except (CommandExecutionError, SaltInvocationError) as e:
         ret["result"] = False